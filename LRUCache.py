@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Caché de capacidad fija con desalojo LRU (el menos usado recientemente).
+    Lleva contadores de aciertos, fallos y desalojos para dimensionarla.
+    """
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Retorna el valor de key (marcándolo como reciente) o default."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key, default=None):
+        """Como get, pero sin alterar el orden ni los contadores."""
+        return self._data.get(key, default)
+
+    def put(self, key, value):
+        """Guarda key -> value, desalojando la entrada más antigua si no cabe."""
+        if self.capacity <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Vacía la caché (los contadores se conservan)."""
+        self._data.clear()
+
+    def stats(self):
+        """Retorna los contadores de uso de la caché."""
+        return {
+            'size': len(self._data),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,58 @@
+import time
+
+
+class Metrics:
+    """
+    Contadores de esfuerzo de los componentes de enrutamiento. Los componentes
+    tienen un atributo `metrics` que vale None (instrumentación apagada: solo
+    se evalúa un `is not None` por llamada) o una instancia de Metrics.
+    """
+    def __init__(self):
+        self.counters = {}
+        self.peaks = {}
+        self.timers = {}  # nombre -> [llamadas, segundos totales, máximo]
+
+    def add(self, name, value=1):
+        """Suma value al contador name."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name, value):
+        """Registra value si supera el máximo observado de name."""
+        if value > self.peaks.get(name, 0):
+            self.peaks[name] = value
+
+    def record_time(self, name, seconds):
+        """Acumula una medición de tiempo (en segundos) para name."""
+        t = self.timers.get(name)
+        if t is None:
+            self.timers[name] = [1, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            if seconds > t[2]:
+                t[2] = seconds
+
+    def timed(self, name, fn, *args):
+        """Ejecuta fn(*args), registra su duración bajo name y retorna el resultado."""
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.record_time(name, time.perf_counter() - start)
+
+    def reset(self):
+        """Reinicia todas las mediciones."""
+        self.counters.clear()
+        self.peaks.clear()
+        self.timers.clear()
+
+    def snapshot(self):
+        """Retorna una copia de las mediciones como diccionario."""
+        return {
+            'counters': dict(self.counters),
+            'peaks': dict(self.peaks),
+            'timers': {
+                name: {'calls': calls, 'total_s': total, 'mean_s': total / calls, 'max_s': mx}
+                for name, (calls, total, mx) in self.timers.items()
+            }
+        }
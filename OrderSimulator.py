@@ -1,4 +1,11 @@
+import json
 import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from RouteManager import init_worker, route_pairs
+from model.frozen_graph import WAREHOUSE, CLIENT
 
 class OrderSimulator:
     def __init__(self, graph, manager, tracker, optimizer):
@@ -6,38 +13,150 @@ class OrderSimulator:
         self.manager = manager
         self.tracker = tracker
         self.optimizer = optimizer
-        self.warehouses = [v for v in graph.vertices() if v.is_warehouse]
-        self.clients = [v for v in graph.vertices() if v.is_client]
+        # Vértices por rol (solo si el grafo es un Graph) y sus ids
+        vertices = graph.vertices() if hasattr(graph, 'vertices') else []
+        self.warehouses = [v for v in vertices if v.is_warehouse]
+        self.clients = [v for v in vertices if v.is_client]
+        frozen = graph.freeze()
+        self.warehouse_ids = frozen.role_ids(WAREHOUSE)
+        self.client_ids = frozen.role_ids(CLIENT)
+        # Instrumentación (Metrics) o None si está apagada
+        self.metrics = None
 
-    def process_origen_destino(self, origin_id, dest_id):
-        print(f"Procesando orden de {origin_id} a {dest_id}...")
+    def process_origen_destino(self, origin_id, dest_id, verbose=True):
+        if verbose:
+            print(f"Procesando orden de {origin_id} a {dest_id}...")
         route = self.optimizer.suggest_optimized_route(origin_id, dest_id)
+        return self._deliver(origin_id, dest_id, route, verbose)
+
+    def _deliver(self, origin_id, dest_id, route, verbose=True):
+        """Registra la ruta de una orden en el tracker y la reporta."""
+        if self.metrics is not None:
+            self.metrics.add('orders.delivered' if route else 'orders.unroutable')
         if not route:
-            print(f"No se encontró ruta de {origin_id} a {dest_id}")
+            if verbose:
+                print(f"No se encontró ruta de {origin_id} a {dest_id}")
             return None
         order_id = f"O{self.tracker.get_next_order_id()}"
         path = route['path']
         cost = route['total_cost']
         recs = route.get('recharge_stops', [])
         self.tracker.register_route(path, cost)
-        print(f"Ruta de {origin_id} a {dest_id}:")
-        print(f"Ruta: {'→'.join(map(str,path))}")
-        print(f"Costo: {cost} | Paradas de recarga: {recs} | Estado: Entregado\n")
+        self.optimizer.record_route(origin_id, dest_id, route)
+        if verbose:
+            print(f"Ruta de {origin_id} a {dest_id}:")
+            print(f"Ruta: {'→'.join(map(str,path))}")
+            print(f"Costo: {cost} | Paradas de recarga: {recs} | Estado: Entregado\n")
         return path, cost, recs, origin_id, dest_id, order_id
 
-    def process_orders(self, n=5):
-        resultados = []
-        for i in range(1, n+1):
-            o = random.choice(self.warehouses)
-            d = random.choice(self.clients)
-            resultado = self.process_origen_destino(o.element()['id'], d.element()['id'])
-            if resultado:
-                resultados.append({
+    def process_orders(self, n=5, batch=False, workers=1, chunk_size=1000):
+        """
+        Simula n órdenes entre almacenes y clientes al azar. Con batch=True
+        todas las rutas se calculan por lotes con RouteManager.find_routes_batch
+        (una búsqueda por almacén) en lugar de una búsqueda por orden.
+        Con workers > 1 el cálculo por lotes se reparte en bloques de
+        chunk_size pares entre procesos (ver _route_parallel).
+        """
+        return list(self.iter_orders(n, batch=batch, workers=workers,
+                                     chunk_size=chunk_size, verbose=True))
+
+    def iter_orders(self, n=5, batch=False, workers=1, chunk_size=1000,
+                    verbose=False, sink=None, sink_batch_size=1000):
+        """
+        Versión perezosa de process_orders: genera los resultados de las
+        órdenes uno a uno, con memoria acotada (los pares se sortean y se
+        enrutan de a chunk_size). Si se da `sink` (ruta de archivo o archivo
+        abierto), además escribe cada orden como una línea JSON (NDJSON), en
+        bloques de sink_batch_size líneas.
+        """
+        if workers > 1:
+            batch = True
+        out = open(sink, 'w', encoding='utf-8') if isinstance(sink, str) else sink
+        lines = []
+        start = time.perf_counter()
+        try:
+            for o_id, d_id, route in self._iter_routes(n, batch, workers, chunk_size):
+                if batch:
+                    if verbose:
+                        print(f"Procesando orden de {o_id} a {d_id}...")
+                    resultado = self._deliver(o_id, d_id, route, verbose)
+                else:
+                    resultado = self.process_origen_destino(o_id, d_id, verbose)
+                if not resultado:
+                    continue
+                order = {
                     'order_id': resultado[5],
                     'origin': resultado[3],
                     'dest': resultado[4],
                     'path': resultado[0],
                     'cost': resultado[1],
                     'recharges': resultado[2]
-                })
-        return resultados
\ No newline at end of file
+                }
+                if out is not None:
+                    lines.append(json.dumps(order))
+                    if len(lines) >= sink_batch_size:
+                        out.write('\n'.join(lines) + '\n')
+                        lines.clear()
+                yield order
+        finally:
+            if out is not None:
+                if lines:
+                    out.write('\n'.join(lines) + '\n')
+                if out is not sink:
+                    out.close()
+            if self.metrics is not None:
+                self.metrics.record_time('orders.run', time.perf_counter() - start)
+
+    def _random_pairs(self, n):
+        """Sortea n pares (almacén, cliente) como ids."""
+        pairs = []
+        for _ in range(n):
+            o = random.choice(self.warehouse_ids)
+            d = random.choice(self.client_ids)
+            pairs.append((o, d))
+        return pairs
+
+    def _iter_chunks(self, n, chunk_size):
+        """Genera los pares de n órdenes en bloques de a lo más chunk_size."""
+        for start in range(0, n, chunk_size):
+            yield self._random_pairs(min(chunk_size, n - start))
+
+    def _iter_routes(self, n, batch, workers, chunk_size):
+        """
+        Genera (origin_id, dest_id, ruta) para n órdenes. Sin batch la ruta es
+        None y se calcula al procesar cada orden.
+        """
+        chunks = self._iter_chunks(n, chunk_size)
+        if workers > 1:
+            routed = self._route_parallel(chunks, workers)
+        elif batch:
+            routed = ((pairs, self.manager.find_routes_batch(pairs)) for pairs in chunks)
+        else:
+            routed = ((pairs, [None] * len(pairs)) for pairs in chunks)
+        for pairs, routes in routed:
+            for (o_id, d_id), route in zip(pairs, routes):
+                yield o_id, d_id, route
+
+    def _route_parallel(self, chunks, workers):
+        """
+        Calcula en paralelo las rutas de cada bloque de pares y genera
+        (pares, rutas) en el orden de los bloques, así que el registro posterior
+        en el tracker es determinista. Cada trabajador recibe una sola vez la
+        instantánea de solo lectura del grafo (Graph.freeze); se mantienen a lo
+        más 2 * workers bloques en vuelo para acotar la memoria.
+        Usa hilos en lugar de procesos si el intérprete no tiene GIL.
+        """
+        gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+        executor_class = ProcessPoolExecutor if gil_enabled else ThreadPoolExecutor
+        with executor_class(max_workers=workers,
+                            initializer=init_worker,
+                            initargs=(self.graph.freeze(),)) as executor:
+            pending = deque()
+            for pairs in chunks:
+                pending.append((pairs, executor.submit(route_pairs, pairs)))
+                if len(pending) >= 2 * workers:
+                    pairs, future = pending.popleft()
+                    yield pairs, future.result()
+            while pending:
+                pairs, future = pending.popleft()
+                yield pairs, future.result()
@@ -1,10 +1,175 @@
 import math
 import heapq
-from collections import deque
+import numpy as np
+from model.frozen_graph import RECHARGE, haversine_km, haversine_km_scalar
+from LRUCache import LRUCache
+
+
+def floyd_warshall(dist, nxt):
+    """
+    Floyd–Warshall sobre matrices NumPy, modificadas en el lugar.
+    dist: matriz (n, n) de costos (np.inf si no hay arista).
+    nxt: matriz (n, n) int32 con el índice del siguiente salto (-1 si no hay camino).
+    Para cada k se relaja de una vez toda la matriz por broadcasting; como la
+    fila y la columna k no cambian en la iteración k, el resultado (incluidos
+    los desempates de nxt) coincide con el triple bucle secuencial.
+    """
+    n = dist.shape[0]
+    via = np.empty_like(dist)
+    better = np.empty(dist.shape, dtype=bool)
+    for k in range(n):
+        np.add(dist[:, k, None], dist[None, k, :], out=via)
+        np.less(via, dist, out=better)
+        np.minimum(dist, via, out=dist)
+        np.copyto(nxt, nxt[:, k, None], where=better)
+
+
+_MISSING = object()
+
+
+class _HaversineBound(dict):
+    """
+    Cota inferior de A* (distancia haversine al destino por el costo mínimo
+    por km), calculada solo para los vértices que la búsqueda consulta y
+    memorizada: h[i] es una búsqueda en dict una vez calculada.
+    """
+    __slots__ = ('lat', 'lon', 'dest_lat', 'dest_lon', 'ratio')
+
+    def __init__(self, fg, dest, ratio):
+        super().__init__()
+        self.lat, self.lon = fg.coordinates()
+        self.dest_lat = self.lat[dest]
+        self.dest_lon = self.lon[dest]
+        self.ratio = ratio
+
+    def __missing__(self, i):
+        value = self.ratio * haversine_km_scalar(self.lat[i], self.lon[i],
+                                                 self.dest_lat, self.dest_lon)
+        self[i] = value
+        return value
+
+
+class _SearchCounter:
+    """
+    Reemplazo de heapq.heappop que se usa solo con la instrumentación activa:
+    registra el tamaño máximo del heap y cada estado extraído.
+    """
+    __slots__ = ('popped', 'queue_peak')
+
+    def __init__(self):
+        self.popped = []
+        self.queue_peak = 0
+
+    def pop(self, heap):
+        if len(heap) > self.queue_peak:
+            self.queue_peak = len(heap)
+        item = heapq.heappop(heap)
+        self.popped.append(item)
+        return item
+
+
+def _copy_route(route):
+    """Copia un dict de ruta para que el llamador no altere la caché."""
+    if route is None:
+        return None
+    copy = dict(route)
+    for key in ('path', 'recharge_stops'):
+        if key in copy:
+            copy[key] = list(copy[key])
+    return copy
+
+
+class _AllPairs:
+    """Matrices de distancias y siguiente salto para una versión del grafo."""
+
+    def __init__(self, ids, dist, nxt, integral, version):
+        self.ids = ids
+        self.id2idx = {vid: i for i, vid in enumerate(ids)}
+        self.dist = dist
+        self.nxt = nxt
+        self.integral = integral
+        self.version = version
+
+    @classmethod
+    def build(cls, graph):
+        """Construye las matrices desde cero con Floyd–Warshall."""
+        fg = graph.freeze()
+        n = len(fg)
+
+        # Inicializar matrices densas dist (float) y nxt (índice del siguiente salto)
+        dist = np.full((n, n), np.inf)
+        np.minimum.at(dist, (fg.sources(), fg.targets), fg.costs)
+        np.minimum(dist, dist.T, out=dist)
+        nxt = np.where(np.isfinite(dist), np.arange(n, dtype=np.int32), -1).astype(np.int32)
+        diag = np.arange(n)
+        dist[diag, diag] = 0
+        nxt[diag, diag] = diag
+
+        floyd_warshall(dist, nxt)
+        return cls(fg.ids.tolist(), dist, nxt, fg.integral, fg.version())
+
+    def apply(self, change):
+        """
+        Aplica una modificación del grafo a las matrices. Retorna False si la
+        modificación no admite reparación incremental.
+        """
+        op = change[1]
+        if op == 'insert_vertex':
+            vid = change[2].element()['id']
+            if vid in self.id2idx:
+                return False
+            n = len(self.ids)
+            self.dist = np.pad(self.dist, ((0, 1), (0, 1)), constant_values=np.inf)
+            self.nxt = np.pad(self.nxt, ((0, 1), (0, 1)), constant_values=-1)
+            self.dist[n, n] = 0
+            self.nxt[n, n] = n
+            self.ids.append(vid)
+            self.id2idx[vid] = n
+            return True
+        if op == 'insert_edge':
+            u, v, c, old = change[2:]
+            if old is not None and c > old:
+                return False
+            a = self.id2idx.get(u.element()['id'])
+            b = self.id2idx.get(v.element()['id'])
+            if a is None or b is None:
+                return False
+            self.integral = self.integral and float(c).is_integer()
+            if a != b:
+                self._relax_edge(a, b, c)
+                self._relax_edge(b, a, c)
+            return True
+        return False
+
+    def _relax_edge(self, a, b, c):
+        """Relaja todos los pares i→a→b→j a través de la nueva arista (a, b)."""
+        dist, nxt = self.dist, self.nxt
+        via = dist[:, a, None] + c + dist[None, b, :]
+        better = via < dist
+        if not better.any():
+            return
+        hop = nxt[:, a].copy()
+        hop[a] = b
+        np.minimum(dist, via, out=dist)
+        np.copyto(nxt, hop[:, None], where=better)
+
 
 class RouteManager:
-    def __init__(self, graph):
+    def __init__(self, graph, min_cost_per_km=None, cache_size=0, station_cache_size=8):
         self.graph = graph
+        # Costo mínimo por km para A*; None lo deriva del grafo
+        self.min_cost_per_km = min_cost_per_km
+        self._derived_cost_per_km = (None, 0.0)
+        self._apsp = None  # Matrices de todos los pares cacheadas (_AllPairs)
+        # battery_limit -> grafo de estaciones de la versión _station_version,
+        # acotado porque cada límite de batería distinto ocupa O(S²)
+        self._station_graphs = LRUCache(station_cache_size)
+        self._station_version = None
+        # Caché opcional de resultados (cache_size=0 la desactiva)
+        self.result_cache = LRUCache(cache_size)
+        self._cache_version = None
+        # Instrumentación (Metrics) o None si está apagada
+        self.metrics = None
 
     def find_route_with_recharge(self,
                                  origin_id: int,
@@ -13,120 +178,334 @@ class RouteManager:
                                  method: str = "dijkstra"):
         """
         Encuentra la ruta desde origin_id hasta dest_id considerando recargas.
-        method: "dijkstra" o "floyd-warshall"
+        El grafo puede ser un model.graph.Graph o su instantánea FrozenGraph.
+        method: "dijkstra", "astar" o "floyd-warshall"
         """
+        if self.metrics is None:
+            return self._find_route(origin_id, dest_id, battery_limit, method)
+        return self.metrics.timed(f"route.{method}", self._find_route,
+                                  origin_id, dest_id, battery_limit, method)
+
+    def _find_route(self, origin_id, dest_id, battery_limit, method):
+        if self.result_cache.capacity <= 0:
+            return self._compute_route(origin_id, dest_id, battery_limit, method)
+        version = self.graph.version()
+        if version != self._cache_version:
+            self.result_cache.clear()
+            self._cache_version = version
+        key = (origin_id, dest_id, battery_limit, method, version)
+        route = self.result_cache.get(key, _MISSING)
+        if route is _MISSING:
+            route = self._compute_route(origin_id, dest_id, battery_limit, method)
+            self.result_cache.put(key, route)
+        return _copy_route(route)
+
+    def cache_stats(self):
+        """Contadores de la caché de resultados (aciertos, fallos, desalojos...)."""
+        return self.result_cache.stats()
+
+    def clear_cache(self):
+        """Vacía la caché de resultados."""
+        self.result_cache.clear()
+
+    def _compute_route(self, origin_id, dest_id, battery_limit, method):
         if method == "dijkstra":
             return self._dijkstra_with_recharge(origin_id, dest_id, battery_limit)
+        elif method == "astar":
+            return self._astar_with_recharge(origin_id, dest_id, battery_limit)
         elif method == "floyd-warshall":
             return self._floyd_warshall_with_recharge(origin_id, dest_id, battery_limit)
         else:
             raise ValueError(f"Método desconocido: {method!r}")
 
     def _dijkstra_with_recharge(self, origin_id, dest_id, battery_limit):
-        origin = self.graph.get_vertex(origin_id)
-        dest   = self.graph.get_vertex(dest_id)
-        Q = deque()
-        Q.append((origin, battery_limit, [origin], [], 0))
-        visited = {}  # (v, battery) -> cost
-        while Q:
-            v, batt, path, recharges, cost = Q.popleft()
-            if v == dest:
-                return {
-                    'path': [x.element()['id'] for x in path],
-                    'total_cost': cost,
-                    'recharge_stops': [x.element()['id'] for x in recharges]
-                }
-            state = (v, batt)
-            if state in visited and visited[state] <= cost:
+        fg = self.graph.freeze()
+        origin = fg.index(origin_id)
+        dest   = fg.index(dest_id)
+        if origin is None or dest is None:
+            return None
+        return self._label_search(fg, origin, {dest}, battery_limit).get(dest)
+
+    def _astar_with_recharge(self, origin_id, dest_id, battery_limit):
+        """
+        A* sobre estados (vértice, batería). La cota inferior es la distancia
+        haversine al destino por el costo mínimo por km; es admisible y
+        consistente, así que conserva las garantías de la búsqueda de Dijkstra.
+        """
+        fg = self.graph.freeze()
+        origin = fg.index(origin_id)
+        dest   = fg.index(dest_id)
+        if origin is None or dest is None:
+            return None
+        ratio = self._cost_per_km(fg)
+        h = _HaversineBound(fg, dest, ratio) if ratio > 0 else None
+        return self._label_search(fg, origin, {dest}, battery_limit, h).get(dest)
+
+    def _cost_per_km(self, fg):
+        """
+        Costo mínimo por km para la heurística de A*. Si no se configuró, se
+        deriva del grafo como el menor costo/longitud entre sus aristas, lo que
+        garantiza que la cota sea admisible. Retorna 0 (sin heurística) si
+        falta alguna coordenada.
+        """
+        if not fg.has_coordinates():
+            return 0.0
+        if self.min_cost_per_km is not None:
+            return self.min_cost_per_km
+        if self._derived_cost_per_km[0] != fg.version():
+            src = fg.sources()
+            km = haversine_km(fg.lat[src], fg.lon[src], fg.lat[fg.targets], fg.lon[fg.targets])
+            mask = km > 0
+            ratio = float(np.min(fg.costs[mask] / km[mask])) if mask.any() else 0.0
+            self._derived_cost_per_km = (fg.version(), ratio)
+        return self._derived_cost_per_km[1]
+
+    def _label_search(self, fg, origin, dests, battery_limit, h=None):
+        """
+        Búsqueda label-setting sobre estados (vértice, batería), por índices de
+        la instantánea CSR. Cada etiqueta guarda un puntero a su padre en lugar
+        de copiar la ruta, y se descartan las etiquetas dominadas: un estado que
+        llega a un vértice ya cerrado con igual o más batería (y, por el orden
+        del heap, menor costo). Con h (cota inferior por vértice) es A*.
+        Retorna {índice destino: ruta} para los destinos alcanzables de `dests`;
+        la búsqueda termina en cuanto se cerraron todos.
+        """
+        pending = set(dests)
+        found = {}
+        offsets, targets, costs, recharge, ids = fg.adjacency()
+
+        # Etiquetas en arreglos paralelos: vértice, padre y costo acumulado
+        label_vertex = [origin]
+        label_parent = [-1]
+        label_cost = [0]
+        heap = [(h[origin] if h is not None else 0, 0, battery_limit)]  # (prioridad, etiqueta, batería)
+        best_batt = {}                                      # vértice -> mayor batería cerrada
+        counter = _SearchCounter() if self.metrics is not None else None
+        pop = counter.pop if counter is not None else heapq.heappop
+        while heap:
+            _, lid, batt = pop(heap)
+            v = label_vertex[lid]
+            cost = label_cost[lid]
+            if v in pending:
+                found[v] = self._build_label_route(fg, label_vertex, label_parent, lid, cost)
+                pending.discard(v)
+                if not pending:
+                    break
+            if best_batt.get(v, -1) >= batt:
                 continue
-            visited[state] = cost
-
-            # Recarga si corresponde
-            if getattr(v, 'is_recharge', False) and v not in recharges:
-                batt = battery_limit
-                recharges = recharges + [v]
-
-            for e in self.graph.incident_edges(v):
-                w = e.opposite(v)
-                c = e.cost()
-                if batt >= c:
-                    Q.append((w, batt - c, path + [w], recharges[:], cost + c))
-        return None
+            best_batt[v] = batt
+
+            for k in range(offsets[v], offsets[v + 1]):
+                c = costs[k]
+                if c > batt:
+                    continue
+                w = targets[k]
+                # Recarga completa al llegar a una estación
+                nb = battery_limit if recharge[w] else batt - c
+                if best_batt.get(w, -1) >= nb:
+                    continue
+                nc = cost + c
+                label_vertex.append(w)
+                label_parent.append(lid)
+                label_cost.append(nc)
+                heapq.heappush(heap, (nc if h is None else nc + h[w], len(label_vertex) - 1, nb))
+        if counter is not None:
+            self._publish_search(counter, label_vertex, offsets, bool(found) and not pending)
+        return found
+
+    def _publish_search(self, counter, label_vertex, offsets, stopped_early):
+        """
+        Publica los contadores de una búsqueda. Las relajaciones se obtienen
+        repitiendo, sobre los estados extraídos, la misma regla de dominancia
+        de la búsqueda (si terminó al cerrar el último destino, ese estado no
+        se expandió).
+        """
+        popped = counter.popped[:-1] if stopped_early else counter.popped
+        best = {}
+        relaxations = 0
+        for _, lid, batt in popped:
+            v = label_vertex[lid]
+            if best.get(v, -1) >= batt:
+                continue
+            best[v] = batt
+            relaxations += offsets[v + 1] - offsets[v]
+        metrics = self.metrics
+        metrics.add('search.calls')
+        metrics.add('search.pushed', len(label_vertex))
+        metrics.add('search.popped', len(counter.popped))
+        metrics.add('search.relaxations', relaxations)
+        metrics.peak('search.queue_peak', counter.queue_peak)
+
+    def find_routes_batch(self, pairs, battery_limit: int = 50):
+        """
+        Calcula rutas para una lista de pares (origin_id, dest_id). Agrupa los
+        pares por origen y hace una sola búsqueda con recargas por origen, de la
+        que se extraen todas las rutas pedidas. Retorna una lista alineada con
+        `pairs`, con el dict de ruta o None si no hay ruta.
+        """
+        if self.metrics is None:
+            return self._find_routes_batch(pairs, battery_limit)
+        return self.metrics.timed('route.batch', self._find_routes_batch, pairs, battery_limit)
+
+    def _find_routes_batch(self, pairs, battery_limit):
+        fg = self.graph.freeze()
+        by_origin = {}
+        for origin_id, dest_id in pairs:
+            by_origin.setdefault(origin_id, set()).add(dest_id)
+        routes = {}
+        for origin_id, dest_ids in by_origin.items():
+            origin = fg.index(origin_id)
+            dests = {fg.index(d) for d in dest_ids} - {None}
+            if origin is None or not dests:
+                continue
+            found = self._label_search(fg, origin, dests, battery_limit)
+            for route in found.values():
+                routes[(origin_id, route['path'][-1])] = route
+        return [routes.get(pair) for pair in pairs]
+
+    @staticmethod
+    def _build_label_route(fg, label_vertex, label_parent, lid, cost):
+        """Reconstruye la ruta siguiendo los punteros al padre de las etiquetas."""
+        _, _, _, recharge, ids = fg.adjacency()
+        path = []
+        while lid != -1:
+            path.append(label_vertex[lid])
+            lid = label_parent[lid]
+        path.reverse()
+        recharges = []
+        for x in path[:-1]:
+            if recharge[x] and ids[x] not in recharges:
+                recharges.append(ids[x])
+        return {
+            'path': [ids[x] for x in path],
+            'total_cost': cost,
+            'recharge_stops': recharges
+        }
+
+    def _all_pairs(self):
+        """
+        Retorna las matrices de todos los pares, cacheadas según la versión del
+        grafo. Si desde la última versión solo se insertaron vértices o aristas
+        (sin encarecer una existente), se reparan en O(n²) por cambio en lugar
+        de recalcularse.
+        """
+        version = self.graph.version()
+        ap = self._apsp
+        event = 'fw.cache_hits'
+        if ap is not None and ap.version != version:
+            changes = self.graph.changes_since(ap.version)
+            if changes is None or not all(ap.apply(c) for c in changes):
+                ap = None
+            else:
+                ap.version = version
+                event = 'fw.repairs'
+        if ap is None:
+            ap = _AllPairs.build(self.graph)
+            self._apsp = ap
+            event = 'fw.builds'
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.add(event)
+            metrics.peak('fw.matrix_nodes', len(ap.ids))
+            metrics.peak('fw.matrix_bytes', ap.dist.nbytes + ap.nxt.nbytes)
+        return ap
+
+    def _station_graph(self, ap, battery_limit):
+        """
+        Grafo de factibilidad entre estaciones de recarga: arista s→t si
+        dist(s, t) <= battery_limit. Se cachea por (versión, battery_limit),
+        ya que solo el origen y el destino cambian entre consultas.
+        Retorna (ids de estaciones, sus índices en ap, adyacencia por id).
+        """
+        if self._station_version != ap.version:
+            self._station_graphs.clear()
+            self._station_version = ap.version
+        cached = self._station_graphs.get(battery_limit)
+        if self.metrics is not None:
+            self.metrics.add('fw.station_graph_hits' if cached is not None else 'fw.station_graph_builds')
+        if cached is not None:
+            return cached
+
+        stations = self.graph.freeze().role_ids(RECHARGE)
+        station_idx = np.array([ap.id2idx[s] for s in stations], dtype=np.intp)
+        sub = ap.dist[np.ix_(station_idx, station_idx)]
+        feasible = sub <= battery_limit
+        np.fill_diagonal(feasible, False)
+        cast = int if ap.integral else float
+        station_adj = {}
+        for i, s_id in enumerate(stations):
+            cols = np.flatnonzero(feasible[i])
+            station_adj[s_id] = [(stations[j], cast(c))
+                                 for j, c in zip(cols.tolist(), sub[i, cols].tolist())]
+        cached = (stations, station_idx, station_adj)
+        self._station_graphs.put(battery_limit, cached)
+        return cached
 
     def _floyd_warshall_with_recharge(self, origin_id, dest_id, battery_limit):
-        # 1) Preparación de vértices y mapeo a índices
-        verts = list(self.graph.vertices())
-        n = len(verts)
-        ids = [v.element()['id'] for v in verts]
-        id2idx = {vid: i for i, vid in enumerate(ids)}
-
-        # 2) Inicializar matrices dist y nxt
-        dist = [[math.inf] * n for _ in range(n)]
-        nxt = [[None] * n for _ in range(n)]
-        for i in range(n):
-            dist[i][i] = 0
-            nxt[i][i] = ids[i]
-
-        for v in verts:
-            i = id2idx[v.element()['id']]
-            for e in self.graph.incident_edges(v):
-                w = e.opposite(v)
-                j = id2idx[w.element()['id']]
-                c = e.cost()
-                if c < dist[i][j]:
-                    dist[i][j] = c
-                    dist[j][i] = c
-                    nxt[i][j] = ids[j]
-                    nxt[j][i] = ids[i]
-
-        # 3) Ejecución de Floyd–Warshall
-        for k in range(n):
-            for i in range(n):
-                for j in range(n):
-                    if dist[i][k] + dist[k][j] < dist[i][j]:
-                        dist[i][j] = dist[i][k] + dist[k][j]
-                        nxt[i][j] = nxt[i][k]
+        # 1-3) Matrices dist/nxt de todos los pares (cacheadas por versión)
+        ap = self._all_pairs()
+        ids, id2idx, dist, nxt = ap.ids, ap.id2idx, ap.dist, ap.nxt
+        integral = ap.integral
+        if origin_id not in id2idx or dest_id not in id2idx:
+            return None
 
         # 4) Reconstrucción de subcamino entre dos vértices
         def build_subpath(u_id, v_id):
             i, j = id2idx[u_id], id2idx[v_id]
-            if nxt[i][j] is None:
+            if nxt[i, j] < 0:
                 return None
             path = [u_id]
-            while u_id != v_id:
-                u_id = nxt[id2idx[u_id]][j]
-                path.append(u_id)
+            while i != j:
+                i = nxt[i, j]
+                path.append(ids[i])
             return path
 
-        # 5) Crear meta-grafo con nodos: origen, estaciones, destino
-        recharge_ids = [v.element()['id'] for v in verts if getattr(v, 'is_recharge', False)]
-        meta_nodes = [origin_id] + recharge_ids + [dest_id]
-        meta_adj = {u: {} for u in meta_nodes}
-        for u in meta_nodes:
-            for v in meta_nodes:
-                if u != v:
-                    d = dist[id2idx[u]][id2idx[v]]
-                    if d <= battery_limit:
-                        meta_adj[u][v] = d
+        # 5) Meta-grafo: estaciones precalculadas + aristas de origen y destino
+        stations, station_idx, station_adj = self._station_graph(ap, battery_limit)
+        o, d = id2idx[origin_id], id2idx[dest_id]
+        cast = int if integral else float
+        to_dest = {}
+        for s_id, c in zip(stations, dist[station_idx, d].tolist()):
+            if c <= battery_limit:
+                to_dest[s_id] = cast(c)
+        from_origin = [(s_id, cast(c))
+                       for s_id, c in zip(stations, dist[o, station_idx].tolist())
+                       if c <= battery_limit and s_id != origin_id]
+        if origin_id != dest_id and dist[o, d] <= battery_limit:
+            from_origin.append((dest_id, cast(dist[o, d])))
+
+        def meta_neighbors(u):
+            if u == origin_id:
+                return from_origin
+            adj = station_adj[u]
+            if u in to_dest:
+                return adj + [(dest_id, to_dest[u])]
+            return adj
 
         # 6) Dijkstra sobre meta-grafo para encontrar secuencia de paradas
-        pq = [(0, origin_id, [origin_id])]
+        pq = [(0, origin_id)]
         best = {origin_id: 0}
+        parent = {origin_id: None}
         meta_path = None
         total_cost = None
         while pq:
-            cost_u, u, path_u = heapq.heappop(pq)
+            cost_u, u = heapq.heappop(pq)
             if u == dest_id:
-                meta_path = path_u
+                meta_path = []
+                while u is not None:
+                    meta_path.append(u)
+                    u = parent[u]
+                meta_path.reverse()
                 total_cost = cost_u
                 break
             if cost_u > best.get(u, math.inf):
                 continue
-            for v, w in meta_adj[u].items():
+            for v, w in meta_neighbors(u):
                 nc = cost_u + w
                 if nc < best.get(v, math.inf):
                     best[v] = nc
-                    heapq.heappush(pq, (nc, v, path_u + [v]))
+                    parent[v] = u
+                    heapq.heappush(pq, (nc, v))
         if meta_path is None:
             return None
 
@@ -146,4 +525,27 @@ class RouteManager:
             'path': full_path,
             'total_cost': total_cost,
             'recharge_stops': recharges
-        }
\ No newline at end of file
+        }
+
+
+# Estado de los procesos trabajadores (ver OrderSimulator.process_orders)
+_worker_manager = None
+
+
+def init_worker(graph, **options):
+    """
+    Inicializador de un proceso trabajador: crea su RouteManager sobre la
+    instantánea de solo lectura del grafo, que se envía una sola vez.
+    """
+    global _worker_manager
+    _worker_manager = RouteManager(graph, **options)
+
+
+def route_pairs(pairs, battery_limit=50):
+    """Calcula en el trabajador las rutas de un bloque de pares (ver find_routes_batch)."""
+    return _worker_manager.find_routes_batch(pairs, battery_limit)
+
+
+def route_one(origin_id, dest_id, battery_limit=50, method="dijkstra"):
+    """Calcula en el trabajador una sola ruta (ver find_route_with_recharge)."""
+    return _worker_manager.find_route_with_recharge(origin_id, dest_id, battery_limit, method)
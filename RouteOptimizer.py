@@ -1,15 +1,22 @@
 from typing import List, Tuple
+import numpy as np
+from LRUCache import LRUCache
+from model.frozen_graph import FrozenGraph
+from RouteManager import _copy_route
 
 class UnionFind:
-    def __init__(self, elements):
-        # parent pointer and rank
-        self.parent = {e: e for e in elements}
-        self.rank = {e: 0 for e in elements}
+    def __init__(self, n):
+        # padre y rango por índice entero 0..n-1
+        self.parent = list(range(n))
+        self.rank = [0] * n
 
     def find(self, x):
-        if self.parent[x] != x:
-            self.parent[x] = self.find(self.parent[x])
-        return self.parent[x]
+        # Iterativo con compresión por división a la mitad (sin recursión)
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
 
     def union(self, x, y):
         rx, ry = self.find(x), self.find(y)
@@ -25,69 +32,166 @@ class UnionFind:
         return True
 
 class RouteOptimizer:
-    def __init__(self, tracker, manager):
+    def __init__(self, tracker, manager, cache_size=1024):
         self.tracker = tracker
         self.manager = manager
+        # Mejor ruta conocida por (origen, destino), con desalojo LRU
+        self.route_index = LRUCache(cache_size)
+        self._index_version = None
+        # MST cacheado: grafo, versión y aristas {(u_id, v_id): peso}
+        self._mst_graph = None
+        self._mst_version = None
+        self._mst_edges = {}
+        # Instrumentación (Metrics) o None si está apagada
+        self.metrics = None
 
     def kruskal_mst(self, graph) -> List[Tuple]:
         """
         Genera el árbol de expansión mínima (MST) del grafo usando Kruskal.
-        Asume grafo no dirigido. Retorna lista de tuplas (u, v, weight).
+        Asume grafo no dirigido. Retorna lista de tuplas (u, v, weight), con
+        vértices si recibe un Graph o con ids si recibe un FrozenGraph.
+        El resultado se cachea por versión del grafo; si desde entonces solo
+        se agregaron vértices o aristas nuevas, se actualiza en lugar de
+        recalcularse.
         """
-        # Recolectar todas las aristas sin duplicados
-        edges = []
-        seen = set()
-        for u in graph.vertices():
-            for e in graph.incident_edges(u):
-                v = e.opposite(u)
-                key = tuple(sorted((u.element()['id'], v.element()['id'])))
-                if key in seen:
-                    continue
-                seen.add(key)
-                edges.append((e.cost(), u, v))
-        # Ordenar por peso ascendente
-        edges.sort(key=lambda x: x[0])
-
-        # Inicializar Union-Find con todos los vértices
-        vertices = [v for v in graph.vertices()]
-        uf = UnionFind(vertices)
-
-        mst = []
-        for weight, u, v in edges:
+        if self.metrics is None:
+            return self._kruskal_mst(graph)
+        return self.metrics.timed('optimizer.kruskal_mst', self._kruskal_mst, graph)
+
+    def _kruskal_mst(self, graph):
+        version = graph.version()
+        event = 'mst.cache_hits' if version == self._mst_version else 'mst.incremental'
+        if graph is not self._mst_graph or not self._update_mst(graph, version):
+            self._mst_edges = self._compute_mst(graph.freeze())
+            self._mst_graph = graph
+            event = 'mst.builds'
+        self._mst_version = version
+        if self.metrics is not None:
+            self.metrics.add(event)
+        if isinstance(graph, FrozenGraph):
+            return [(u, v, w) for (u, v), w in self._mst_edges.items()]
+        return [(graph.get_vertex(u), graph.get_vertex(v), w)
+                for (u, v), w in self._mst_edges.items()]
+
+    @staticmethod
+    def _compute_mst(fg):
+        """Kruskal sobre la instantánea CSR. Retorna {(u_id, v_id): peso}."""
+        # Aristas sin duplicados, ordenadas por peso ascendente (orden estable)
+        src, dst, costs = fg.undirected_edges()
+        order = np.argsort(costs, kind='stable').tolist()
+        src, dst, costs = src.tolist(), dst.tolist(), costs.tolist()
+
+        # Inicializar Union-Find con todos los índices de vértices
+        n = len(fg)
+        uf = UnionFind(n)
+        ids = fg.ids.tolist()
+        cast = int if fg.integral else float
+        mst = {}
+        for k in order:
+            u, v = src[k], dst[k]
             if uf.union(u, v):
-                mst.append((u, v, weight))
+                mst[(ids[u], ids[v])] = cast(costs[k])
+                if len(mst) == n - 1:
+                    break
+        return mst
+
+    def _update_mst(self, graph, version):
+        """
+        Actualiza el MST cacheado con las modificaciones del grafo desde la
+        última versión. Si solo se agregaron vértices o aristas nuevas, el
+        nuevo MST es el de las aristas del MST anterior más las agregadas, así
+        que basta un Kruskal sobre ellas (O((V + k) log(V + k)) para k aristas
+        nuevas). Retorna False si hay modificaciones que requieren recalcular
+        (eliminaciones, cambios de costo o historial incompleto).
+        """
+        if version == self._mst_version:
+            return True
+        changes = graph.changes_since(self._mst_version)
+        if changes is None:
+            return False
+        added = []
+        for change in changes:
+            op = change[1]
+            if op == 'insert_vertex':
+                continue
+            if op != 'insert_edge' or change[5] is not None:
+                return False
+            u, v = change[2].element()['id'], change[3].element()['id']
+            if u != v:
+                added.append(((u, v), change[4]))
+        if added:
+            self._mst_edges = self._kruskal_edges(list(self._mst_edges.items()) + added)
+        return True
+
+    @staticmethod
+    def _kruskal_edges(edges):
+        """Kruskal sobre una lista [((u_id, v_id), peso)]. Retorna {(u_id, v_id): peso}."""
+        index = {}
+        for (u, v), _ in edges:
+            index.setdefault(u, len(index))
+            index.setdefault(v, len(index))
+        uf = UnionFind(len(index))
+        weights = np.array([w for _, w in edges], dtype=np.float64)
+        mst = {}
+        for k in np.argsort(weights, kind='stable').tolist():
+            (u, v), w = edges[k]
+            if uf.union(index[u], index[v]):
+                mst[(u, v)] = w
         return mst
 
-    def suggest_optimized_route(self, origin_id: int, dest_id: int):
-        history = self.tracker.get_most_frequent_routes(10)
-        best = None
-        best_score = float('inf')
-        for route_str, freq in history:
-            ids = list(map(int, route_str.split('→')))
-            if ids[0] == origin_id and ids[-1] == dest_id:
-                cost_est = len(ids) - 1
-                score = cost_est / (freq or 1)
-                if score < best_score:
-                    best_score, best = score, ids
+    def _sync_route_index(self):
+        """Vacía el índice de rutas si el grafo cambió desde que se llenó."""
+        version = self.manager.graph.version()
+        if version != self._index_version:
+            self.route_index.clear()
+            self._index_version = version
+
+    def record_route(self, origin_id: int, dest_id: int, route: dict, battery_limit: int = 50):
+        """
+        Registra una ruta conocida para el par y el límite de batería con que
+        se calculó, si mejora la que ya había. Se guarda una copia.
+        """
+        if not route or 'total_cost' not in route:
+            return
+        self._sync_route_index()
+        key = (origin_id, dest_id, battery_limit)
+        known = self.route_index.peek(key)
+        if known is None or route['total_cost'] < known['total_cost']:
+            self.route_index.put(key, _copy_route(route))
+
+    def best_known_route(self, origin_id: int, dest_id: int, battery_limit: int = 50):
+        """
+        Retorna una copia de la mejor ruta conocida (con su costo real) para el
+        par y límite de batería, o None.
+        """
+        self._sync_route_index()
+        return _copy_route(self.route_index.get((origin_id, dest_id, battery_limit)))
+
+    def suggest_optimized_route(self, origin_id: int, dest_id: int, battery_limit: int = 50):
+        if self.metrics is None:
+            return self._suggest_route(origin_id, dest_id, battery_limit)
+        return self.metrics.timed('optimizer.suggest', self._suggest_route,
+                                  origin_id, dest_id, battery_limit)
+
+    def _suggest_route(self, origin_id, dest_id, battery_limit):
+        best = self.best_known_route(origin_id, dest_id, battery_limit)
+        if self.metrics is not None:
+            self.metrics.add('optimizer.index_hits' if best else 'optimizer.index_misses')
         if best:
-            return {
-                'path': best,
-                'total_cost': (len(best) - 1) * 10,
-                'recharge_stops': []
-            }
-        return self.manager.find_route_with_recharge(origin_id, dest_id)
+            return best
+        route = self.manager.find_route_with_recharge(origin_id, dest_id, battery_limit)
+        self.record_route(origin_id, dest_id, route, battery_limit)
+        return route
 
     def get_optimization_report(self) -> str:
-        hist = self.tracker.get_most_frequent_routes()
+        hist = self.tracker.get_most_frequent_paths()
         report = "Decisiones de optimización:\n"
         report += "Se priorizaron rutas frecuentes y bajo costo.\nTop segmentos:\n"
         segs = {}
-        for route, freq in hist:
-            pts = route.split('→')
-            for i in range(len(pts) - 1):
-                seg = f"{pts[i]}→{pts[i+1]}"
+        for pts, freq in hist:
+            for seg in zip(pts, pts[1:]):
                 segs[seg] = segs.get(seg, 0) + freq
         top = sorted(segs.items(), key=lambda x: x[1], reverse=True)[:5]
         for seg, cnt in top:
-            report += f"{seg}: {cnt} usos\n"
+            report += f"{self.tracker.format_route(seg)}: {cnt} usos\n"
         return report
@@ -1,24 +1,98 @@
+import numpy as np
 from avl_tree import AVL, Node
+from model.frozen_graph import is_int_id
 
 class RouteTracker:
-    def __init__(self):
-        self.avl = AVL()
-        self.node_map = {}
-    def register_route(self, path_ids, cost):
-        key = '→'.join(map(str, path_ids))
-        self.avl.insert(key, 1)
+    def __init__(self, graph=None):
+        self.avl = AVL()          # id de ruta -> frecuencia
+        self._route_ids = {}      # tupla de ids de vértices -> id de ruta
+        self._paths = []          # id de ruta -> tupla de ids de vértices
+        # Visitas por vértice en arreglos paralelos indexados por "slot"
+        # (orden de primera visita); el rol sale del grafo, si se entrega.
+        self.graph = graph
+        self._slot = {}           # id de vértice -> slot
+        self._slot_ids = np.zeros(64, dtype=np.int64)
+        self._visits = np.zeros(64, dtype=np.int64)
+        self._roles = np.zeros(64, dtype=np.uint8)
+    def route_id(self, path_ids):
+        """Retorna el id entero (interno) de la ruta, registrándola si es nueva."""
+        path = tuple(path_ids)
+        rid = self._route_ids.get(path)
+        if rid is None:
+            rid = len(self._paths)
+            self._route_ids[path] = rid
+            self._paths.append(path)
+        return rid
+    def route_path(self, rid):
+        """Retorna la tupla de ids de vértices de la ruta con id rid."""
+        return self._paths[rid]
+    @staticmethod
+    def format_route(path_ids):
+        """Representación de texto de una ruta, solo para mostrar."""
+        return '→'.join(map(str, path_ids))
+    def _slots(self, path_ids):
+        """Retorna los slots de los vértices de la ruta, creando los nuevos."""
+        slot = self._slot
+        out = []
         for vid in path_ids:
-            self.node_map[vid] = self.node_map.get(vid, 0) + 1
+            s = slot.get(vid)
+            if s is None:
+                s = self._new_slot(vid)
+            out.append(s)
+        return out
+    def _new_slot(self, vid):
+        s = len(self._slot)
+        if s == len(self._visits):
+            size = 2 * s
+            self._slot_ids = np.resize(self._slot_ids, size)
+            self._visits = np.concatenate((self._visits, np.zeros(s, dtype=np.int64)))
+            self._roles = np.concatenate((self._roles, np.zeros(s, dtype=np.uint8)))
+        self._slot[vid] = s
+        if self._slot_ids.dtype != object and not is_int_id(vid):
+            self._slot_ids = self._slot_ids.astype(object)
+        self._slot_ids[s] = vid
+        if self.graph is not None:
+            fg = self.graph.freeze()
+            i = fg.index(vid)
+            if i is not None:
+                self._roles[s] = fg.roles[i]
+        return s
+    def register_route(self, path_ids, cost):
+        self.avl.insert(self.route_id(path_ids), 1)
+        slots = self._slots(path_ids)     # puede agrandar los arreglos
+        np.add.at(self._visits, slots, 1)
+    def get_most_frequent_paths(self, n=5):
+        """Retorna [(tupla de ids, frecuencia)] de las n rutas más frecuentes."""
+        return [(self._paths[rid], freq) for rid, freq in self.avl.most_frequent(n)]
     def get_most_frequent_routes(self, n=5):
-        results = []
-        def inorder(node):
-            if not node: return
-            inorder(node.left)
-            results.append((node.key, node.value))
-            inorder(node.right)
-        inorder(self.avl.root)
-        return sorted(results, key=lambda x: x[1], reverse=True)[:n]
+        return [(self.format_route(path), freq) for path, freq in self.get_most_frequent_paths(n)]
+    @property
+    def node_map(self):
+        """Visitas por id de vértice, en orden de primera visita."""
+        n = len(self._slot)
+        return dict(zip(self._slot_ids[:n].tolist(), self._visits[:n].tolist()))
+    def visit_arrays(self, role=None):
+        """
+        Retorna (ids, visitas) como arreglos NumPy de los vértices visitados,
+        opcionalmente solo los que tienen el rol dado (bit de model.frozen_graph).
+        """
+        n = len(self._slot)
+        if role is None:
+            return self._slot_ids[:n], self._visits[:n]
+        mask = self._roles[:n] & role != 0
+        return self._slot_ids[:n][mask], self._visits[:n][mask]
+    def top_visited(self, n=10, role=None):
+        """
+        Retorna [(id, visitas)] de los n vértices más visitados (todos si n es
+        None), opcionalmente de un solo rol. Los empates quedan en orden de
+        primera visita.
+        """
+        ids, visits = self.visit_arrays(role)
+        order = np.argsort(-visits, kind='stable')
+        if n is not None:
+            order = order[:n]
+        return list(zip(ids[order].tolist(), visits[order].tolist()))
     def get_node_visit_stats(self):
-        return dict(sorted(self.node_map.items(), key=lambda x: x[1], reverse=True))
+        return dict(self.top_visited(None))
     def get_next_order_id(self):
-        return len(self.node_map) + 1
\ No newline at end of file
+        return len(self._slot) + 1
@@ -1,41 +1,194 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import FastAPI, HTTPException, Request
 from sim.simulation import Simulation
 from model.graph import Graph
-from model.vertex import Vertex
+from model.graph_io import NDJSONDecoder
+from RouteManager import init_worker, route_one, route_pairs
 
 app = FastAPI()
 
 simulation = None
+# Procesos que calculan rutas fuera del event loop; cada uno recibe una
+# sola vez la instantánea del grafo de la simulación actual
+executor = None
+# Cálculos en curso: clave -> future, para fusionar solicitudes idénticas
+inflight = {}
+
+
+def build_graph(datos):
+    """Construye el grafo a partir del JSON recibido (se ejecuta fuera del loop)."""
+    vertices = datos.get("vertices", [])
+    edges = datos.get("edges", [])
+    if not vertices or not edges:
+        raise HTTPException(status_code=400, detail="Invalid graph data")
+    grafo = Graph()
+    # Los extremos de cada arista se resuelven por id contra los vértices cargados
+    grafo.load_records({"vertex": vertex.get("data", {})} for vertex in vertices)
+    grafo.load_records({"edge": edge} for edge in edges)
+    return grafo
+
+
+def prepare_simulation(grafo):
+    """
+    Crea la simulación y la instantánea CSR del grafo para los trabajadores.
+    Ambas recorren el grafo completo, así que se ejecuta fuera del loop.
+    """
+    return Simulation(grafo), grafo.freeze()
+
+
+def finish_stream(grafo, decoder):
+    """Carga los registros pendientes del flujo NDJSON y prepara la simulación."""
+    grafo.load_records(decoder.close())
+    if not grafo.vertices():
+        raise ValueError("Invalid graph data")
+    return prepare_simulation(grafo)
+
+
+def start_executor(frozen):
+    """Reemplaza el pool de trabajadores por uno con la instantánea dada."""
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    executor = ProcessPoolExecutor(initializer=init_worker, initargs=(frozen,))
+    inflight.clear()
+
+
+def install_simulation(sim, frozen):
+    """Publica la simulación ya preparada y su pool (en el loop: solo asignaciones)."""
+    global simulation
+    simulation = sim
+    start_executor(frozen)
+
+
+async def run_coalesced(key, fn, *args):
+    """
+    Ejecuta fn(*args) en el pool de procesos. Si ya hay un cálculo en curso
+    con la misma clave, espera ese resultado en lugar de lanzar otro.
+    """
+    future = inflight.get(key)
+    if future is None:
+        future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        inflight[key] = future
+        future.add_done_callback(lambda _: inflight.pop(key, None))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # Cancelado por start_executor al iniciar otra simulación (no por el cliente)
+        if future.cancelled():
+            raise HTTPException(status_code=503,
+                                detail="Simulation restarted while routing; retry the request")
+        raise
+
+
+def resolve_vertex_id(sim, raw):
+    """
+    Retorna el id de vértice del grafo que corresponde a raw: tal cual si
+    existe (ids de texto o enteros en JSON), o convertido a entero si así
+    existe (los parámetros de la URL llegan como texto). None si no existe.
+    """
+    id2idx = sim.graph.freeze().id2idx
+    try:
+        if raw in id2idx:
+            return raw
+        as_int = int(raw)
+    except (TypeError, ValueError):
+        return None
+    return as_int if as_int in id2idx else None
+
+
+def require_simulation():
+    if simulation is None:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    return simulation
+
 
 # comenzar la simulación
 @app.post("/start_simulation")
 async def start_simulation(grafojson: dict):
     try:
         datos = grafojson.get("grafo", {})
-        # Contruir el grafo a partir del JSON recibido
-        vertices = datos.get("vertices", [])
-        edges = datos.get("edges", [])
-        if not vertices or not edges:
-            raise HTTPException(status_code=400, detail="Invalid graph data")
-        grafo = Graph()
-        for vertex in vertices:
-            grafo.insert_vertex(vertex.get("data", {}))
-        for edge in edges:
-            u = Vertex(edge.get("from"))
-            v = Vertex(edge.get("to"))
-            grafo.insert_edge(u, v, edge.get("cost", {}))
-        # Iniciar la simulación
-        print("funciona hasta aqui")
-        global simulation
-        simulation = Simulation(grafo)
+        # Construir el grafo, la simulación y la instantánea fuera del event loop
+        sim, frozen = await asyncio.to_thread(
+            lambda: prepare_simulation(build_graph(datos)))
+        install_simulation(sim, frozen)
         return {"message": "Simulation started successfully"}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# comenzar la simulación desde un flujo NDJSON de vértices y aristas
+@app.post("/start_simulation/stream")
+async def start_simulation_stream(request: Request):
+    """
+    Recibe el grafo como NDJSON ({"vertex": {...}} o {"edge": {"from", "to", "cost"}}
+    por línea, vértices antes de sus aristas) y lo construye a medida que llegan
+    los trozos, sin retener el cuerpo completo de la solicitud.
+    """
+    grafo = Graph()
+    decoder = NDJSONDecoder()
+    try:
+        async for chunk in request.stream():
+            records = decoder.feed(chunk)
+            if records:
+                await asyncio.to_thread(grafo.load_records, records)
+        # Últimos registros, simulación e instantánea fuera del event loop
+        sim, frozen = await asyncio.to_thread(finish_stream, grafo, decoder)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    install_simulation(sim, frozen)
+    return {"message": "Simulation started successfully",
+            "vertices": len(frozen)}
+
 # Obtener simulación
 @app.get("/get_simulation")
 async def get_simulation():
-    global simulation
-    if simulation is None:
-        raise HTTPException(status_code=404, detail="Simulation not found")
-    return simulation
\ No newline at end of file
+    sim = require_simulation()
+    return {
+        "vertices": len(sim.graph.vertices()),
+        "edges": len(sim.graph.edges()),
+        "version": sim.graph.version(),
+        "orders": len(sim.orders)
+    }
+
+# Calcular una ruta con recargas
+@app.get("/route")
+async def route(origin: str, dest: str, battery_limit: int = 50, method: str = "dijkstra"):
+    sim = require_simulation()
+    origin, dest = resolve_vertex_id(sim, origin), resolve_vertex_id(sim, dest)
+    if origin is None or dest is None:
+        raise HTTPException(status_code=404, detail="Vertex not found")
+    key = ("route", id(sim), origin, dest, battery_limit, method)
+    try:
+        result = await run_coalesced(key, route_one, origin, dest, battery_limit, method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Route not found")
+    return result
+
+# Calcular rutas para varios pares (origin, dest) a la vez
+@app.post("/routes/batch")
+async def routes_batch(body: dict):
+    sim = require_simulation()
+    try:
+        raw_pairs = [(o, d) for o, d in body.get("pairs", [])]
+        battery_limit = int(body.get("battery_limit", 50))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400,
+                            detail="pairs must be a list of [origin, dest] and battery_limit an integer")
+    # Los vértices desconocidos quedan como None y su par se responde con route = None
+    pairs = [(resolve_vertex_id(sim, o), resolve_vertex_id(sim, d)) for o, d in raw_pairs]
+    key = ("batch", id(sim), tuple(pairs), battery_limit)
+    routes = await run_coalesced(key, route_pairs, pairs, battery_limit)
+    return {"routes": [
+        {"origin": o, "dest": d, "route": r} for (o, d), r in zip(raw_pairs, routes)
+    ]}
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
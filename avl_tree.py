@@ -1,3 +1,5 @@
+import uuid
+
 class Node:
     def __init__(self, key, value):
         self.key = key
@@ -6,11 +8,87 @@ class Node:
         self.right = None
         self.height = 1
 
+class _Bucket:
+    __slots__ = ('freq', 'keys', 'prev', 'next')
+    def __init__(self, freq):
+        self.freq = freq
+        self.keys = {}  # dict como conjunto ordenado por llegada
+        self.prev = self
+        self.next = self
+
+class FrequencyIndex:
+    """
+    Índice de llaves ordenado por frecuencia: lista doblemente enlazada de
+    buckets (uno por frecuencia presente, de menor a mayor). Incrementar en 1
+    es O(1) y obtener las k más frecuentes es O(k). Dentro de una misma
+    frecuencia, las llaves quedan en orden de llegada a esa frecuencia.
+    """
+    def __init__(self):
+        self._head = _Bucket(0)  # centinela de la lista circular
+        self._bucket = {}        # llave -> bucket
+    def __len__(self):
+        return len(self._bucket)
+    def frequency(self, key):
+        b = self._bucket.get(key)
+        return b.freq if b else 0
+    def add(self, key, amount=1):
+        head = self._head
+        cur = self._bucket.get(key, head)
+        if cur is not head and amount == 0:
+            return
+        freq = cur.freq + amount
+        # Buscar el bucket destino caminando desde el actual
+        pos = cur
+        if amount >= 0:
+            while pos.next is not head and pos.next.freq <= freq:
+                pos = pos.next
+        else:
+            while pos is not head and pos.freq > freq:
+                pos = pos.prev
+        if pos.freq != freq or pos is head:
+            b = _Bucket(freq)
+            b.prev, b.next = pos, pos.next
+            pos.next.prev = b
+            pos.next = b
+            pos = b
+        if cur is not head:
+            del cur.keys[key]
+            if not cur.keys:
+                cur.prev.next = cur.next
+                cur.next.prev = cur.prev
+        pos.keys[key] = None
+        self._bucket[key] = pos
+    def top(self, n):
+        """Retorna [(llave, frecuencia)] de las n llaves más frecuentes."""
+        result = []
+        b = self._head.prev
+        while b is not self._head and len(result) < n:
+            for key in b.keys:
+                result.append((key, b.freq))
+                if len(result) == n:
+                    break
+            b = b.prev
+        return result
+
 class AVL:
     def __init__(self):
         self.root = None
+        self.index = FrequencyIndex()  # mismas llaves, ordenadas por valor
+        self.version = 0               # aumenta con cada inserción
+        self.uid = uuid.uuid4().hex    # identificador único (claves de caché)
     def insert(self, key, value):
         self.root = self._insert(self.root, key, value)
+        self.index.add(key, value)
+        self.version += 1
+    def find(self, key):
+        """Retorna el nodo con la llave dada, o None (búsqueda iterativa)."""
+        node = self.root
+        while node is not None and node.key != key:
+            node = node.left if key < node.key else node.right
+        return node
+    def most_frequent(self, n):
+        """Retorna [(llave, valor)] de las n llaves con mayor valor acumulado."""
+        return self.index.top(n)
     def _insert(self, node, key, value):
         if node is None:
             return Node(key, value)
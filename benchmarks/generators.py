@@ -0,0 +1,83 @@
+import random
+from model.graph import Graph
+
+
+def mst_random_graph(n_nodes, m_edges=None, seed=0):
+    """
+    Grafo con la topología del dashboard (pestaña Run Simulation): roles
+    barajados (20% almacenes, 20% estaciones, resto clientes), coordenadas en
+    Temuco, un árbol aleatorio que conecta todos los nodos y aristas extra al
+    azar hasta completar m_edges (por defecto 2 * n_nodes).
+    """
+    rng = random.Random(seed)
+    if m_edges is None:
+        m_edges = 2 * n_nodes
+    g = Graph()
+    roles = ['almacen'] * (n_nodes // 5) + ['estacion'] * (n_nodes // 5) + ['cliente'] * (n_nodes - 2 * (n_nodes // 5))
+    rng.shuffle(roles)
+    vertices = g.insert_vertices({
+        'id': i,
+        'almacen': (roles[i] == 'almacen'),
+        'cliente': (roles[i] == 'cliente'),
+        'estacion': (roles[i] == 'estacion'),
+        'lat': rng.uniform(-38.8, -38.6),
+        'lon': rng.uniform(-72.7, -72.5)
+    } for i in range(n_nodes))
+
+    # Conexión tipo MST
+    unconnected = vertices[:]
+    connected = [unconnected.pop()]
+    while unconnected:
+        u = rng.choice(connected)
+        # swap-pop en O(1) en lugar de pop(i), que es O(n)
+        i = rng.randint(0, len(unconnected) - 1)
+        unconnected[i], unconnected[-1] = unconnected[-1], unconnected[i]
+        v = unconnected.pop()
+        g.insert_edge(u, v, rng.randint(5, 20))
+        connected.append(v)
+
+    # Aristas adicionales
+    max_possible_edges = n_nodes * (n_nodes - 1) // 2
+    remaining = min(m_edges, max_possible_edges) - (n_nodes - 1)
+    attempts = 0
+    while remaining > 0 and attempts < 10 * m_edges:
+        u = rng.choice(vertices)
+        v = rng.choice(vertices)
+        if u != v and not g.get_edge(u, v):
+            g.insert_edge(u, v, rng.randint(5, 20))
+            remaining -= 1
+        attempts += 1
+    return g
+
+
+def uniform_random_graph(n_nodes, m_edges=None, seed=0):
+    """
+    Grafo con la topología de pestaña_1: los primeros n/10 nodos son
+    almacenes, los últimos n/10 clientes, cada quinto nodo es estación, y
+    m_edges aristas entre pares al azar (sin garantía de conexidad).
+    """
+    rng = random.Random(seed)
+    if m_edges is None:
+        m_edges = 2 * n_nodes
+    m_edges = min(m_edges, n_nodes * (n_nodes - 1) // 2)
+    g = Graph()
+    verts = g.insert_vertices({
+        'id': i,
+        'almacen': (i < max(1, n_nodes // 10)),
+        'cliente': (i >= n_nodes - max(1, n_nodes // 10)),
+        'estacion': (i % 5 == 0 and i != 0)
+    } for i in range(n_nodes))
+    edge_count = 0
+    while edge_count < m_edges:
+        u = rng.choice(verts)
+        v = rng.choice(verts)
+        if u != v and not g.get_edge(u, v):
+            g.insert_edge(u, v, rng.randint(5, 20))
+            edge_count += 1
+    return g
+
+
+GENERATORS = {
+    'mst': mst_random_graph,
+    'uniform': uniform_random_graph,
+}
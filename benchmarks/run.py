@@ -0,0 +1,157 @@
+"""
+Benchmarks de enrutamiento, MST y tracker sobre grafos sintéticos con semilla.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.run --sizes 100 1000 10000 --out bench.json
+    python -m benchmarks.run --sizes 100 1000 --baseline bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.generators import GENERATORS
+from RouteManager import RouteManager
+from RouteTracker import RouteTracker
+from RouteOptimizer import RouteOptimizer
+from OrderSimulator import OrderSimulator
+from model.frozen_graph import WAREHOUSE, CLIENT
+
+
+def timeit(fn, repeat):
+    """Retorna la mediana en segundos de `repeat` ejecuciones de fn()."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def route_queries(graph, count, seed):
+    """Pares (almacén, cliente) reproducibles para las consultas de ruta."""
+    fg = graph.freeze()
+    rng = random.Random(seed)
+    warehouses, clients = fg.role_ids(WAREHOUSE), fg.role_ids(CLIENT)
+    return [(rng.choice(warehouses), rng.choice(clients)) for _ in range(count)]
+
+
+def bench_graph(graph, args):
+    """Mide cada operación sobre un grafo. Retorna {nombre: segundos}."""
+    n = len(graph.vertices())
+    results = {}
+    pairs = route_queries(graph, args.queries, args.seed)
+
+    def routes(method):
+        manager = RouteManager(graph)
+        for o, d in pairs:
+            manager.find_route_with_recharge(o, d, args.battery, method)
+
+    results['route_dijkstra'] = timeit(lambda: routes("dijkstra"), args.repeat) / len(pairs)
+    if n <= args.fw_max_nodes:
+        # Incluye la construcción de las matrices de todos los pares
+        results['route_floyd_warshall'] = timeit(lambda: routes("floyd-warshall"), args.repeat) / len(pairs)
+
+    results['kruskal_mst'] = timeit(lambda: RouteOptimizer(None, None).kruskal_mst(graph), args.repeat)
+
+    manager = RouteManager(graph)
+    paths = [r['path'] for r in manager.find_routes_batch(pairs, args.battery) if r]
+    paths = (paths * (args.tracker_routes // max(1, len(paths)) + 1))[:args.tracker_routes]
+
+    def register():
+        tracker = RouteTracker()
+        for path in paths:
+            tracker.register_route(path, 0)
+        return tracker
+
+    results['tracker_register_route'] = timeit(register, args.repeat) / max(1, len(paths))
+    tracker = register()
+    results['tracker_most_frequent'] = timeit(lambda: tracker.get_most_frequent_routes(10), args.repeat)
+
+    def orders(batch):
+        random.seed(args.seed)
+        rt = RouteTracker()
+        sim = OrderSimulator(graph, manager, rt, RouteOptimizer(rt, manager))
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.process_orders(args.orders, batch=batch)
+
+    results['process_orders'] = timeit(lambda: orders(False), args.repeat)
+    results['process_orders_batch'] = timeit(lambda: orders(True), args.repeat)
+    return results
+
+
+def run(args):
+    results = {}
+    for topology in args.topologies:
+        for n in args.sizes:
+            graph = GENERATORS[topology](n, seed=args.seed)
+            for name, seconds in bench_graph(graph, args).items():
+                key = f"{topology}/{n}/{name}"
+                results[key] = seconds
+                print(f"{key}: {seconds * 1000:.3f} ms", file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'sizes': args.sizes,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """
+    Compara contra una corrida anterior. Retorna la lista de regresiones:
+    mediciones más lentas que la base por más del factor `tolerance`.
+    """
+    regressions = []
+    base = baseline.get('results', {})
+    for key, seconds in sorted(current['results'].items()):
+        if key not in base or base[key] <= 0:
+            continue
+        ratio = seconds / base[key]
+        mark = "REGRESIÓN" if ratio > tolerance else ""
+        print(f"{key}: {ratio:.2f}x {mark}")
+        if ratio > tolerance:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--topologies', nargs='+', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=20, help="consultas de ruta por grafo")
+    parser.add_argument('--orders', type=int, default=100, help="órdenes por process_orders")
+    parser.add_argument('--tracker-routes', type=int, default=10000, help="rutas registradas en el tracker")
+    parser.add_argument('--battery', type=int, default=50)
+    parser.add_argument('--fw-max-nodes', type=int, default=1000,
+                        help="tamaño máximo para Floyd–Warshall (memoria O(n²))")
+    parser.add_argument('--out', help="archivo JSON donde guardar los resultados")
+    parser.add_argument('--baseline', help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="factor de lentitud a partir del cual se reporta regresión")
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
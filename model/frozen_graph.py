@@ -0,0 +1,198 @@
+import math
+import uuid
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Bits de la máscara de roles
+WAREHOUSE = 1
+CLIENT = 2
+RECHARGE = 4
+
+
+def is_int_id(vid):
+    """Indica si el id cabe en un arreglo int64 (entero, sin contar bool)."""
+    return (isinstance(vid, (int, np.integer)) and not isinstance(vid, bool)
+            and -2**63 <= vid < 2**63)
+
+
+def id_array(ids):
+    """
+    Arreglo de ids: int64 si todos son enteros; si no (ids de texto u otros
+    hashables), un arreglo de objetos con los mismos valores.
+    """
+    if isinstance(ids, np.ndarray) and ids.dtype.kind in 'iu':
+        return ids.astype(np.int64, copy=False)
+    ids = list(ids)
+    if all(is_int_id(vid) for vid in ids):
+        return np.array(ids, dtype=np.int64)
+    arr = np.empty(len(ids), dtype=object)
+    for i, vid in enumerate(ids):
+        arr[i] = vid
+    return arr
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distancia de gran círculo en km (acepta escalares o arreglos NumPy)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_km_scalar(lat1, lon1, lat2, lon2):
+    """haversine_km para un solo par de puntos, con math (sin costo de NumPy)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class FrozenGraph:
+    """
+    Instantánea inmutable de un Graph en formato CSR (compressed sparse row).
+    Los vecinos salientes del vértice de índice i son
+    targets[offsets[i]:offsets[i+1]], con sus costos en costs. Los vértices
+    se identifican por índice; ids[i] es su id y id2idx el mapeo inverso.
+    """
+
+    def __init__(self, ids, roles, offsets, targets, costs,
+                 lat=None, lon=None, directed=False, version=0):
+        self.ids = id_array(ids)
+        self.roles = np.asarray(roles, dtype=np.uint8)
+        self.offsets = np.asarray(offsets, dtype=np.int32)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.costs = np.asarray(costs, dtype=np.float64)
+        # Coordenadas (NaN si el vértice no las tiene)
+        n = len(self.ids)
+        self.lat = np.full(n, np.nan) if lat is None else np.asarray(lat, dtype=np.float64)
+        self.lon = np.full(n, np.nan) if lon is None else np.asarray(lon, dtype=np.float64)
+        for arr in self._arrays():
+            arr.flags.writeable = False
+        self.id2idx = {vid: i for i, vid in enumerate(self.ids.tolist())}
+        self.directed = directed
+        self.integral = bool(np.all(np.floor(self.costs) == self.costs))
+        self._version = version
+        self._adjacency = None
+        self._coordinates = None
+        self._has_coordinates = None
+        self.uid = uuid.uuid4().hex  # Identificador único de esta instancia (claves de caché)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Construye la instantánea a partir de un model.graph.Graph."""
+        verts = list(graph.vertices())
+        index = {v: i for i, v in enumerate(verts)}
+        ids = [v.element()['id'] for v in verts]
+        roles = [(WAREHOUSE if v.is_warehouse else 0)
+                 | (CLIENT if v.is_client else 0)
+                 | (RECHARGE if v.is_recharge else 0) for v in verts]
+        lat = [v.element().get('lat', np.nan) for v in verts]
+        lon = [v.element().get('lon', np.nan) for v in verts]
+        offsets = [0]
+        targets = []
+        costs = []
+        for v in verts:
+            for e in graph.incident_edges(v):
+                targets.append(index[e.opposite(v)])
+                costs.append(e.cost())
+            offsets.append(len(targets))
+        return cls(ids, roles, offsets, targets, costs, lat, lon,
+                   directed=graph.is_directed(), version=graph.version())
+
+    def freeze(self):
+        """Una instantánea ya está congelada."""
+        return self
+
+    def version(self):
+        """Versión del grafo del que se tomó la instantánea."""
+        return self._version
+
+    def changes_since(self, version):
+        """La instantánea no cambia: no hay historial que reparar."""
+        return [] if version == self._version else None
+
+    def is_directed(self):
+        """Indica si el grafo original era dirigido."""
+        return self.directed
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index(self, id_):
+        """Retorna el índice del vértice con el id dado, o None."""
+        return self.id2idx.get(id_)
+
+    def has_role(self, i, role):
+        """Indica si el vértice de índice i tiene el rol dado (bit de la máscara)."""
+        return bool(self.roles[i] & role)
+
+    def role_indices(self, role):
+        """Retorna los índices de los vértices con el rol dado."""
+        return np.flatnonzero(self.roles & role)
+
+    def role_ids(self, role):
+        """Retorna los ids de los vértices con el rol dado."""
+        return self.ids[self.roles & role != 0].tolist()
+
+    def has_coordinates(self):
+        """Indica si todos los vértices tienen lat/lon (se calcula una vez)."""
+        if self._has_coordinates is None:
+            self._has_coordinates = not (np.isnan(self.lat).any() or np.isnan(self.lon).any())
+        return self._has_coordinates
+
+    def coordinates(self):
+        """Retorna (lat, lon) como listas de Python, cacheadas en la instantánea."""
+        if self._coordinates is None:
+            self._coordinates = (self.lat.tolist(), self.lon.tolist())
+        return self._coordinates
+
+    def sources(self):
+        """Retorna, para cada entrada de targets, el índice de su vértice origen."""
+        return np.repeat(np.arange(len(self.ids), dtype=np.int32), np.diff(self.offsets))
+
+    def undirected_edges(self):
+        """
+        Retorna (src, dst, costs) con cada arista una sola vez, en el orden en
+        que aparece por primera vez al recorrer las filas.
+        """
+        src = self.sources()
+        dst = self.targets
+        n = len(self.ids)
+        lo = np.minimum(src, dst).astype(np.int64)
+        hi = np.maximum(src, dst).astype(np.int64)
+        _, first = np.unique(lo * n + hi, return_index=True)
+        first.sort()
+        return src[first], dst[first], self.costs[first]
+
+    def adjacency(self):
+        """
+        Retorna (offsets, targets, costs, recharge, ids) como listas de Python,
+        pensadas para los bucles internos de búsqueda (indexar listas es mucho
+        más rápido que indexar arreglos NumPy elemento a elemento).
+        """
+        if self._adjacency is None:
+            costs = self.costs.astype(np.int64) if self.integral else self.costs
+            self._adjacency = (
+                self.offsets.tolist(),
+                self.targets.tolist(),
+                costs.tolist(),
+                (self.roles & RECHARGE != 0).tolist(),
+                self.ids.tolist(),
+            )
+        return self._adjacency
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_adjacency'] = None
+        state['_coordinates'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for arr in self._arrays():
+            arr.flags.writeable = False
+
+    def _arrays(self):
+        return (self.ids, self.roles, self.offsets, self.targets, self.costs,
+                self.lat, self.lon)
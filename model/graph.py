@@ -1,5 +1,13 @@
+import uuid
+from collections import deque
 from model.vertex import Vertex
 from model.edge import Edge
+from model.frozen_graph import FrozenGraph
+
+def _vertex_ref(ref):
+    """Id de un extremo de arista dado como id o como elemento de vértice."""
+    return ref.get('id') if isinstance(ref, dict) else ref
+
 
 class Graph:
     def __init__(self, directed=False):
@@ -7,6 +15,40 @@ class Graph:
         self._outgoing = {}        # Diccionario: vértice -> adyacentes
         self._incoming = {} if directed else self._outgoing
         self._directed = directed  # Tipo de grafo: True si es dirigido
+        self._index = {}           # Índice: id -> vértice (búsqueda O(1))
+        self._version = 0          # Contador de modificaciones
+        self._changes = deque(maxlen=256)  # Historial reciente de modificaciones
+        self._frozen = None        # Última instantánea CSR (ver freeze)
+        self.uid = uuid.uuid4().hex  # Identificador único de esta instancia (claves de caché)
+
+    def version(self):
+        """Retorna el número de versión, que aumenta con cada modificación."""
+        return self._version
+
+    def changes_since(self, version):
+        """
+        Retorna la lista de modificaciones posteriores a `version`, como tuplas
+        (versión, operación, *datos), o None si el historial ya no las cubre.
+        """
+        if version == self._version:
+            return []
+        if not self._changes or self._changes[0][0] > version + 1:
+            return None
+        return [c for c in self._changes if c[0] > version]
+
+    def freeze(self):
+        """
+        Retorna una instantánea inmutable en formato CSR (FrozenGraph) del grafo
+        actual. Se reutiliza mientras el grafo no cambie de versión.
+        """
+        if self._frozen is None or self._frozen.version() != self._version:
+            self._frozen = FrozenGraph.from_graph(self)
+        return self._frozen
+
+    def _touch(self, *change):
+        """Registra una modificación y avanza la versión."""
+        self._version += 1
+        self._changes.append((self._version,) + change)
 
     def is_directed(self):
         """Indica si el grafo es dirigido."""
@@ -14,24 +56,67 @@ class Graph:
 
     def insert_vertex(self, element):
         """Crea un nuevo vértice y lo agrega al grafo."""
+        vid = element.get('id')
+        try:
+            hash(vid)
+        except TypeError:
+            raise ValueError(f"Id de vértice inválido: {vid!r}") from None
         v = Vertex(element)
         self._outgoing[v] = {}    # Agrega vértice al diccionario de salidas
         if self._directed:
             self._incoming[v] = {}  # Solo si es dirigido, agrega entrada
+        self._index[vid] = v
+        self._touch('insert_vertex', v)
         return v
 
+    def insert_vertices(self, elements):
+        """Carga masiva de vértices. Retorna la lista de vértices creados."""
+        return [self.insert_vertex(element) for element in elements]
+
     def insert_edge(self, u, v, cost):
         """Crea y agrega una arista entre dos vértices dados."""
+        old = self._outgoing[u].get(v)
         e = Edge(u, v, cost)
         self._outgoing[u][v] = e   # Agrega arista a salidas
         self._incoming[v][u] = e   # Agrega arista a entradas
+        self._touch('insert_edge', u, v, cost, old.cost() if old else None)
         return e
 
+    def insert_edge_by_id(self, u_id, v_id, cost):
+        """Crea una arista entre los vértices con los ids dados (búsqueda O(1))."""
+        u = self._index.get(u_id)
+        v = self._index.get(v_id)
+        if u is None or v is None:
+            raise ValueError(f"Vértice desconocido: {u_id if u is None else v_id!r}")
+        return self.insert_edge(u, v, cost)
+
+    def load_records(self, records):
+        """
+        Carga masiva incremental desde registros {"vertex": {...}} o
+        {"edge": {"from": id, "to": id, "cost": c}}. Los extremos de una arista
+        pueden venir como id o como el elemento del vértice (con su 'id'), y
+        deben haberse cargado antes. Retorna la cantidad de registros cargados.
+        """
+        count = 0
+        for record in records:
+            if 'vertex' in record:
+                self.insert_vertex(record['vertex'])
+            elif 'edge' in record:
+                edge = record['edge']
+                self.insert_edge_by_id(_vertex_ref(edge.get('from')),
+                                       _vertex_ref(edge.get('to')),
+                                       edge.get('cost'))
+            else:
+                raise ValueError(f"Registro desconocido: {record!r}")
+            count += 1
+        return count
+
     def remove_edge(self, u, v):
         """Elimina la arista entre u y v, si existe."""
         if u in self._outgoing and v in self._outgoing[u]:
             del self._outgoing[u][v]
             del self._incoming[v][u]
+            self._touch('remove_edge', u, v)
 
     def remove_vertex(self, v):
         """Elimina un vértice y todas sus aristas incidentes."""
@@ -42,6 +127,9 @@ class Graph:
         self._outgoing.pop(v, None)
         if self._directed:
             self._incoming.pop(v, None)
+        if self._index.get(v.element().get('id')) is v:
+            del self._index[v.element().get('id')]
+        self._touch('remove_vertex', v)
 
     def get_edge(self, u, v):
         """Retorna la arista desde u hasta v, o None si no existe."""
@@ -118,10 +206,8 @@ class Graph:
         return result
     
     def get_vertex(self, id_):  # bUSCA POR ID
-        for v in self.vertices():
-            if v.element()['id'] == id_:
-                return v
-        return None
+        """Retorna el vértice con el id dado (O(1)), o None si no existe."""
+        return self._index.get(id_)
 
     '''def get_vertex(self, element):
         #Busca y devuelve el vértice con el elemento dado.
@@ -0,0 +1,106 @@
+import json
+import struct
+import numpy as np
+from model.graph import Graph
+from model.frozen_graph import FrozenGraph
+
+
+class NDJSONDecoder:
+    """
+    Decodificador incremental de NDJSON (un objeto JSON por línea). Recibe
+    trozos arbitrarios de bytes o texto y retorna los objetos de las líneas
+    completas; solo retiene en memoria la última línea incompleta.
+    """
+
+    def __init__(self):
+        self._pending = b''
+
+    def feed(self, chunk):
+        """Agrega un trozo y retorna la lista de objetos de las líneas completas."""
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        lines = (self._pending + chunk).split(b'\n')
+        self._pending = lines.pop()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def close(self):
+        """Retorna el objeto de la última línea, si quedó sin salto de línea."""
+        line, self._pending = self._pending, b''
+        return [json.loads(line)] if line.strip() else []
+
+
+def iter_ndjson(chunks):
+    """Genera los objetos de un flujo NDJSON dado como iterable de trozos."""
+    decoder = NDJSONDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+def load_ndjson(chunks, graph=None):
+    """
+    Construye (o extiende) un Graph a partir de un flujo NDJSON de registros
+    de vértices y aristas (ver Graph.load_records), sin cargar el flujo
+    completo en memoria.
+    """
+    if graph is None:
+        graph = Graph()
+    graph.load_records(iter_ndjson(chunks))
+    return graph
+
+
+# Formato binario: cabecera fija seguida de los arreglos de la instantánea CSR,
+# ordenados de mayor a menor alineación para no necesitar relleno.
+_MAGIC = b'TPGRAPH1'
+_HEADER = struct.Struct('<8sqqqq')  # magic, n, nnz, directed, version
+_HEADER_SIZE = 64
+
+
+def _layout(n, nnz):
+    """Retorna [(nombre, dtype, cantidad, offset)] de los arreglos del archivo."""
+    fields = [('ids', np.int64, n), ('lat', np.float64, n), ('lon', np.float64, n),
+              ('costs', np.float64, nnz), ('offsets', np.int32, n + 1),
+              ('targets', np.int32, nnz), ('roles', np.uint8, n)]
+    layout = []
+    offset = _HEADER_SIZE
+    for name, dtype, count in fields:
+        layout.append((name, dtype, count, offset))
+        offset += np.dtype(dtype).itemsize * count
+    return layout
+
+
+def save_binary(graph, path):
+    """
+    Guarda el grafo (Graph o FrozenGraph) en un archivo binario compacto:
+    ids, máscara de roles, lat/lon y las aristas en formato CSR.
+    """
+    fg = graph.freeze()
+    if fg.ids.dtype != np.int64:
+        raise ValueError("El formato binario solo admite ids de vértice enteros")
+    n, nnz = len(fg), len(fg.targets)
+    with open(path, 'wb') as f:
+        header = _HEADER.pack(_MAGIC, n, nnz, int(fg.directed), fg.version())
+        f.write(header.ljust(_HEADER_SIZE, b'\0'))
+        for name, dtype, count, offset in _layout(n, nnz):
+            f.write(np.ascontiguousarray(getattr(fg, name), dtype=dtype).tobytes())
+
+
+def load_binary(path):
+    """
+    Abre un archivo de save_binary como FrozenGraph cuyos arreglos son
+    numpy.memmap de solo lectura: la carga no copia los datos, y varios
+    procesos que abren el mismo archivo comparten la caché de páginas.
+    """
+    with open(path, 'rb') as f:
+        magic, n, nnz, directed, version = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != _MAGIC:
+        raise ValueError(f"Archivo de grafo inválido: {path!r}")
+    arrays = {}
+    for name, dtype, count, offset in _layout(n, nnz):
+        if count == 0:
+            arrays[name] = np.empty(0, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+    return FrozenGraph(arrays['ids'], arrays['roles'], arrays['offsets'],
+                       arrays['targets'], arrays['costs'], arrays['lat'], arrays['lon'],
+                       directed=bool(directed), version=version)
@@ -1,46 +1,160 @@
 from collections import deque
 from model.graph import Graph
 from model.vertex import Vertex
+from model.graph_io import load_binary
+from model.frozen_graph import CLIENT
+from domain.client import Client
 
 from RouteManager import RouteManager
 from RouteTracker import RouteTracker
 from RouteOptimizer import RouteOptimizer
 from OrderSimulator import OrderSimulator
+from Metrics import Metrics
 
 class Simulation:
-    def __init__(self, graph=None):
+    def __init__(self, graph=None, instrument=False):
         self.graph = graph
         self.orders = {}
         self.order_count = 1
         self.clients = []
-        if graph is not None:
+        if graph is not None and hasattr(graph, 'vertices'):
             self.clients = [v for v in graph.vertices() if v.is_client]
         self.routes = {}
+        # Índices de órdenes, mantenidos al crear cada orden
+        self.order_ids = []                 # IDs en orden de creación
+        self.client_index = {}              # id de cliente -> Client (con sus IDs de orden)
+        self.orders_by_origin = {}          # id de almacén -> [IDs de orden]
+        if graph is not None:
+            for vid in graph.freeze().role_ids(CLIENT):
+                self.client_index[vid] = Client(vid, f"Cliente {vid}")
         self.route_manager = RouteManager(graph)
-        self.route_tracker = RouteTracker()
+        self.route_tracker = RouteTracker(graph)
         self.route_optimizer = RouteOptimizer(self.route_tracker, self.route_manager)
         self.order_simulator = OrderSimulator(self.graph, self.route_manager, self.route_tracker, self.route_optimizer)
+        self.metrics = None
+        self.enable_stats(instrument)
+
+    def enable_stats(self, enabled=True):
+        """
+        Activa o desactiva la instrumentación de RouteManager, RouteOptimizer
+        y OrderSimulator. Apagada, los componentes no registran nada.
+        """
+        self.metrics = (self.metrics or Metrics()) if enabled else None
+        for component in (self.route_manager, self.route_optimizer, self.order_simulator):
+            component.metrics = self.metrics
+
+    def stats(self):
+        """
+        Instantánea de la instrumentación: contadores (estados empujados y
+        extraídos, relajaciones, aciertos de cachés...), máximos (tamaño de la
+        cola, tamaño de la matriz de Floyd–Warshall) y tiempos por llamada.
+        """
+        snapshot = self.metrics.snapshot() if self.metrics is not None else {}
+        snapshot['enabled'] = self.metrics is not None
+        snapshot['route_cache'] = self.route_manager.cache_stats()
+        snapshot['route_index'] = self.route_optimizer.route_index.stats()
+        return snapshot
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Inicia una simulación sobre un grafo guardado con model.graph_io.save_binary.
+        El grafo queda como FrozenGraph (solo lectura) mapeado en memoria.
+        """
+        return cls(load_binary(path))
         
-    def create_order_from_route(self, origin_id: int, dest_id: int, path_info: dict) -> str:
+    def create_order_from_route(self, origin_id: int, dest_id: int, path_info: dict,
+                                battery_limit: int = 50) -> str:
         """
-        Crea una orden usando la información de ruta calculada
-        y la almacena en el diccionario self.orders.
+        Crea una orden usando la información de ruta calculada (con el límite
+        de batería battery_limit) y la almacena en el diccionario self.orders.
         Devuelve el ID de la orden.
         """
-        oid = f"O{self.order_count}"
-        self.orders[oid] = {
+        oid = self._store_order({
             "origin": origin_id,
             "dest": dest_id,
             "path": path_info.get("path", []),
             "cost": path_info.get("total_cost", 0),
             "recharges": path_info.get("recharge_stops", [])
-        }
-        self.order_count += 1
+        })
+        self.route_optimizer.record_route(origin_id, dest_id, path_info, battery_limit)
         # Registrar ruta en el tracker si es posible
         if hasattr(self.route_tracker, 'record_route'):
             self.route_tracker.record_route(self.orders[oid]["path"])
         return oid
 
+    def _store_order(self, order):
+        """
+        Guarda la orden con el siguiente ID correlativo, la agrega a los
+        índices por cliente y por origen, y devuelve su ID.
+        """
+        oid = f"O{self.order_count}"
+        self.orders[oid] = order
+        self.order_count += 1
+        self.order_ids.append(oid)
+        dest = order["dest"]
+        client = self.client_index.get(dest)
+        if client is None:
+            client = self.client_index[dest] = Client(dest, f"Cliente {dest}")
+        client.add_order(oid)
+        self.orders_by_origin.setdefault(order["origin"], []).append(oid)
+        return oid
+
+    def client_page(self, page=0, page_size=50):
+        """
+        Retorna (filas, total) con una página de clientes y su cantidad de
+        órdenes, leída del índice por cliente.
+        """
+        clients = list(self.client_index.values())
+        start = page * page_size
+        rows = [
+            {"client_id": c.client_id, "name": c.name, "total_orders": len(c.orders)}
+            for c in clients[start:start + page_size]
+        ]
+        return rows, len(clients)
+
+    def order_page(self, page=0, page_size=50, client_id=None, origin_id=None):
+        """
+        Retorna (filas, total) con una página de órdenes como (ID, orden).
+        Con client_id u origin_id se recorre solo el índice correspondiente.
+        """
+        if client_id is not None:
+            client = self.client_index.get(client_id)
+            ids = client.orders if client is not None else []
+        elif origin_id is not None:
+            ids = self.orders_by_origin.get(origin_id, [])
+        else:
+            ids = self.order_ids
+        start = page * page_size
+        rows = [(oid, self.orders[oid]) for oid in ids[start:start + page_size]]
+        return rows, len(ids)
+
+    def run_orders(self, n, batch=True, chunk_size=50, progress=None):
+        """
+        Procesa n órdenes al azar con un único OrderSimulator, reutilizando las
+        cachés de rutas ya calientes. Las rutas se calculan por bloques de
+        chunk_size pares (con batch=True, una búsqueda por almacén y bloque) y
+        tras cada bloque se llama progress(procesadas, n) si se entrega.
+        Devuelve la lista de IDs de las órdenes creadas.
+        """
+        created = []
+        done = 0
+        while done < n:
+            size = min(chunk_size, n - done)
+            for result in self.order_simulator.iter_orders(size, batch=batch, chunk_size=size):
+                created.append(self._store_order({
+                    "origin": result['origin'],
+                    "dest": result['dest'],
+                    "path": result['path'],
+                    "cost": result['cost'],
+                    "recharges": result['recharges'],
+                    "status": "Por entregar"
+                }))
+            done += size
+            if progress is not None:
+                progress(done, n)
+        return created
+
     '''def find_route_with_recharge(self, origin_id, dest_id, max_autonomy=50):
         origin = self.graph.get_vertex(origin_id)
         dest = self.graph.get_vertex(dest_id)
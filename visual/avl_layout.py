@@ -0,0 +1,48 @@
+from collections import deque
+
+
+def avl_layout(root, max_depth=4, max_nodes=63):
+    """
+    Distribuye un subárbol del AVL para dibujarlo, sin recursión.
+
+    Se recorre por niveles desde `root` hasta max_depth niveles y a lo más
+    max_nodes nodos; luego se asigna x por recorrido in-order (con pila
+    explícita) e y = -profundidad. Retorna un diccionario con:
+      - "nodes": {llave: (x, y, valor, oculto)}, donde oculto indica que el
+        nodo tiene hijos que quedaron fuera del dibujo (se puede expandir);
+      - "edges": [(llave_padre, llave_hijo)].
+    Solo contiene datos simples, por lo que se puede cachear.
+    """
+    if root is None:
+        return {"nodes": {}, "edges": []}
+
+    depth = {root.key: 0}
+    edges = []
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        d = depth[node.key]
+        if d + 1 >= max_depth:
+            continue
+        for child in (node.left, node.right):
+            if child is not None and len(depth) < max_nodes:
+                depth[child.key] = d + 1
+                edges.append((node.key, child.key))
+                queue.append(child)
+
+    nodes = {}
+    stack = []
+    node = root
+    x = 0
+    while True:
+        while node is not None and node.key in depth:
+            stack.append(node)
+            node = node.left
+        if not stack:
+            break
+        node = stack.pop()
+        hidden = any(c is not None and c.key not in depth for c in (node.left, node.right))
+        nodes[node.key] = (x, -depth[node.key], node.value, hidden)
+        x += 1
+        node = node.right
+    return {"nodes": nodes, "edges": edges}
@@ -3,16 +3,40 @@ from streamlit_folium import st_folium
 import matplotlib.pyplot as plt
 import networkx as nx
 import random
+import numpy as np
 from visual.networkx_adapter import NetworkXAdapter
+from visual.map_layers import network_geojson, segments_geojson, path_coordinates
+from visual.avl_layout import avl_layout
 from sim.simulation import Simulation
 from model.graph import Graph
+from model.frozen_graph import WAREHOUSE, CLIENT, RECHARGE
 from RouteManager import RouteManager
 from RouteTracker import RouteTracker
 from RouteOptimizer import RouteOptimizer
-from OrderSimulator import OrderSimulator
 import folium
 import requests
 
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def base_network_layers(_graph, graph_uid, version):
+    """
+    Capa base (nodos y aristas) en GeoJSON, calculada una vez por versión del
+    grafo y reutilizada entre reruns. _graph no se hashea: la clave de caché
+    es (graph_uid, version), con el identificador único del grafo (id() se
+    reutiliza entre objetos y la versión solo cuenta modificaciones).
+    """
+    return network_geojson(_graph)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_avl_layout(_avl, avl_uid, version, root_key, max_depth, max_nodes):
+    """
+    Layout del subárbol del AVL con raíz root_key, calculado una vez por
+    árbol (AVL.uid), versión (AVL.version) y límites de dibujo.
+    """
+    return avl_layout(_avl.find(root_key), max_depth, max_nodes)
+
+
 def run_dashboard():
     st.set_page_config(layout="wide")
     st.title("Sistema de Drones Autónomos")
@@ -106,21 +130,18 @@ def run_dashboard():
                 return'''
 
             st.session_state.sim = Simulation(g)
-
-            for _ in range(n_orders):
-                order_simulator = OrderSimulator(g, st.session_state.sim.route_manager, st.session_state.sim.route_tracker, st.session_state.sim.route_optimizer)
-                results = order_simulator.process_orders(1)
-                for result in results:
-                    st.session_state.sim.orders[result['order_id']] = {
-                        "origin": result['origin'],
-                        "dest": result['dest'],
-                        "path": result['path'],
-                        "cost": result['cost'],
-                        "recharges": result['recharges'],
-                        "status": "Por entregar"
-                    }
+            # La ruta calculada y el subárbol expandido pertenecen a la simulación anterior
+            st.session_state.pop("last_route", None)
+            st.session_state.pop("avl_root", None)
+
+            # Una sola corrida por lotes sobre el mismo simulador y cachés
+            barra = st.progress(0.0, text="Procesando órdenes...")
+            st.session_state.sim.run_orders(
+                n_orders,
+                progress=lambda hechas, total: barra.progress(hechas / total, text=f"Órdenes {hechas}/{total}")
+            )
+            barra.empty()
             st.success(f"Órdenes procesadas: {len(st.session_state.sim.orders)}")
-            print(st.session_state.sim.orders)
 
     # --------------------------
     # TAB 2: Explore Network
@@ -134,25 +155,25 @@ def run_dashboard():
             sim = st.session_state.sim
             graph = sim.graph
 
-            # 1) Prepara la lista de vértices por rol
-            almacenes = [v for v in graph.vertices() if v.is_warehouse]
-            clientes  = [v for v in graph.vertices() if v.is_client]
-            estaciones = [v for v in graph.vertices() if v.is_recharge]
+            # 1) Prepara la lista de ids por rol
+            frozen = graph.freeze()
+            almacenes = frozen.role_ids(WAREHOUSE)
+            clientes  = frozen.role_ids(CLIENT)
 
             # 2) Controles de selección
             origen = st.selectbox(
                 "Nodo Origen (📦 Almacén)",
-                options=[v.element()["id"] for v in almacenes],
+                options=almacenes,
                 format_func=lambda x: f"Almacén {x}"
             )
             destino = st.selectbox(
                 "Nodo Destino (👤 Cliente)",
-                options=[v.element()["id"] for v in clientes],
+                options=clientes,
                 format_func=lambda x: f"Cliente {x}"
             )
             algoritmo = st.radio(
                 "Algoritmo de ruta",
-                ("Dijkstra", "Floyd-Warshall")
+                ("Dijkstra", "A*", "Floyd-Warshall")
             )
 
             col1, col2, col3 = st.columns([1,1,1])
@@ -162,7 +183,9 @@ def run_dashboard():
 
             # 3) Al hacer click, guardamos en session_state
             if calculate_btn:
-                method = "dijkstra" if algoritmo == "Dijkstra" else "floyd-warshall"
+                method = {"Dijkstra": "dijkstra",
+                          "A*": "astar",
+                          "Floyd-Warshall": "floyd-warshall"}[algoritmo]
                 res = sim.route_manager.find_route_with_recharge(
                     origen, destino, battery_limit=50, method=method
                 )
@@ -183,69 +206,50 @@ def run_dashboard():
                     )
                     st.success(f"Orden {oid} creada: {origen} → {destino}")
 
-            # 4) Construye el mapa base
-            m = folium.Map(location=[-38.7359, -72.5904], zoom_start=13)
-
-            # Dibuja nodos
-            for v in graph.vertices():
-                lat, lon = v.element()["lat"], v.element()["lon"]
-                role = ("almacenamiento" if v.is_warehouse
-                        else "recarga" if v.is_recharge
-                        else "cliente")
-                color = {"almacenamiento": "orange",
-                        "recarga": "blue",
-                        "cliente": "green"}[role]
-                folium.CircleMarker(
-                    [lat, lon],
-                    radius=6,
-                    color=color,
-                    fill=True,
-                    fill_opacity=0.9,
-                    popup=f"{v.element()['id']} ({role})"
-                ).add_to(m)
+            # 4) Construye el mapa base: una capa GeoJSON cacheada por versión
+            #    del grafo, dibujada en canvas en vez de un marcador por vértice
+            nodes_fc, edges_fc = base_network_layers(graph, graph.uid, graph.version())
+            m = folium.Map(location=[-38.7359, -72.5904], zoom_start=13, prefer_canvas=True)
 
             # Dibuja aristas
-            for edge in graph.edges():
-                u, v = edge.endpoints()
-                cost = edge.cost()
-                lat1, lon1 = u.element()["lat"], u.element()["lon"]
-                lat2, lon2 = v.element()["lat"], v.element()["lon"]
-                folium.PolyLine(
-                    [(lat1, lon1), (lat2, lon2)],
-                    weight=2,
-                    opacity=0.6,
-                    popup=f"Cost: {cost}"
-                ).add_to(m)
+            folium.GeoJson(
+                edges_fc,
+                name="Aristas",
+                style_function=lambda f: {"weight": 2, "opacity": 0.6},
+                tooltip=folium.GeoJsonTooltip(fields=["cost"], aliases=["Cost:"])
+            ).add_to(m)
 
-            # 5) Si show_mst está en sesión, dibuja el MST
+            # Dibuja nodos
+            folium.GeoJson(
+                nodes_fc,
+                name="Nodos",
+                marker=folium.CircleMarker(radius=6, fill=True, fill_opacity=0.9),
+                style_function=lambda f: {"color": f["properties"]["color"],
+                                          "fillColor": f["properties"]["color"]},
+                popup=folium.GeoJsonPopup(fields=["id", "role"], labels=False)
+            ).add_to(m)
+
+            # 5) Si show_mst está en sesión, dibuja el MST (solo esta capa y la
+            #    ruta se recalculan en cada rerun)
             if st.session_state.get("show_mst"):
                 mst_edges = sim.route_optimizer.kruskal_mst(graph)
-                for u, v, w in mst_edges:
-                    lat1, lon1 = u.element()["lat"], u.element()["lon"]
-                    lat2, lon2 = v.element()["lat"], v.element()["lon"]
-                    folium.PolyLine(
-                        [(lat1, lon1), (lat2, lon2)],
-                        weight=3,
-                        color="gray",
-                        dash_array="5,5",
-                        popup=f"MST {u.element()['id']}–{v.element()['id']} (w={w})"
-                    ).add_to(m)
+                folium.GeoJson(
+                    segments_geojson(graph, mst_edges),
+                    name="MST",
+                    style_function=lambda f: {"weight": 3, "color": "gray", "dashArray": "5,5"},
+                    tooltip=folium.GeoJsonTooltip(fields=["from", "to", "weight"],
+                                                  aliases=["MST", "–", "w"])
+                ).add_to(m)
 
             # 6) Si last_route está en sesión, dibuja la ruta roja y resumen
             if "last_route" in st.session_state:
                 route_info = st.session_state["last_route"]
                 path = route_info["path"]
-                for i in range(len(path) - 1):
-                    u = graph.get_vertex(path[i])
-                    v = graph.get_vertex(path[i + 1])
-                    folium.PolyLine(
-                        [
-                            (u.element()["lat"], u.element()["lon"]),
-                            (v.element()["lat"], v.element()["lon"])
-                        ],
-                        color="red",
-                        weight=4
-                    ).add_to(m)
+                folium.PolyLine(
+                    path_coordinates(graph, path),
+                    color="red",
+                    weight=4
+                ).add_to(m)
                 st.markdown(f"**Ruta:** {' → '.join(map(str, path))}")
                 st.markdown(f"**Costo total:** {route_info['total_cost']}")
                 st.markdown(f"**Recargas:** {route_info['recharge_stops'] or 'Ninguna'}")
@@ -266,25 +270,42 @@ def run_dashboard():
         else:
             sim = st.session_state.sim
 
-            # Lista de clientes (vértices que son clientes)
+            page_size = st.selectbox("Filas por página", (25, 50, 100, 500), index=1)
+
+            # Lista de clientes, servida desde el índice por cliente
             st.markdown("### 👤 Lista de Clientes")
-            clientes_data = []
-            for v in sim.graph.vertices():
-                if v.is_client:
-                    vid = v.element()["id"]
-                    total_ordenes = sum(1 for o in sim.orders.values() if o["dest"] == vid)
-                    clientes_data.append({
-                        "Cliente ID": vid,
-                        "Nombre": f"Cliente {vid}",
-                        "Tipo": "cliente",
-                        "Total de Órdenes": total_ordenes
-                    })
+            total_clientes = len(sim.client_index)
+            pag_clientes = st.number_input(
+                "Página de clientes", min_value=1,
+                max_value=max(1, -(-total_clientes // page_size)), value=1
+            )
+            clientes, _ = sim.client_page(pag_clientes - 1, page_size)
+            clientes_data = [
+                {
+                    "Cliente ID": c["client_id"],
+                    "Nombre": c["name"],
+                    "Tipo": "cliente",
+                    "Total de Órdenes": c["total_orders"]
+                }
+                for c in clientes
+            ]
             st.dataframe(clientes_data, use_container_width=True)
 
-            # Lista de órdenes registradas
+            # Lista de órdenes registradas (opcionalmente de un solo cliente)
             st.markdown("### 📦 Lista de Órdenes")
+            filtro = st.selectbox(
+                "Filtrar por cliente",
+                options=[None] + list(sim.client_index),
+                format_func=lambda x: "Todos" if x is None else f"Cliente {x}"
+            )
+            _, total_ordenes = sim.order_page(0, 0, client_id=filtro)
+            pag_ordenes = st.number_input(
+                "Página de órdenes", min_value=1,
+                max_value=max(1, -(-total_ordenes // page_size)), value=1
+            )
+            ordenes, _ = sim.order_page(pag_ordenes - 1, page_size, client_id=filtro)
             ordenes_data = []
-            for oid, orden in sim.orders.items():
+            for oid, orden in ordenes:
                 ordenes_data.append({
                     "ID": oid,
                     "Cliente ID": orden["dest"],
@@ -295,6 +316,7 @@ def run_dashboard():
                     "Costo Total": orden["cost"]
                 })
             st.dataframe(ordenes_data, use_container_width=True)
+            st.caption(f"{total_ordenes} órdenes en total")
 
     with p4:
         st.subheader("📈 Análisis de Rutas")
@@ -311,7 +333,7 @@ def run_dashboard():
             top_n = st.slider("Cantidad de rutas frecuentes a mostrar", 1, 20, 10)
 
             # 2) Obtener y ordenar rutas
-            routes = tracker.get_most_frequent_routes(n=top_n)
+            routes = tracker.get_most_frequent_paths(n=top_n)
             if not routes:
                 st.warning("No hay rutas registradas todavía.")
             else:
@@ -320,7 +342,7 @@ def run_dashboard():
                 # 3) Tabla de rutas frecuentes
                 st.markdown("#### 📋 Rutas Más Frecuentes")
                 df_routes = [
-                    {"Ruta": path, "Frecuencia": freq}
+                    {"Ruta": tracker.format_route(path), "Frecuencia": freq}
                     for path, freq in sorted_routes
                 ]
                 st.dataframe(df_routes, use_container_width=True)
@@ -340,8 +362,9 @@ def run_dashboard():
                 modo = st.radio("Ver detalle por:", ("Ruta", "Nodo"))
                 if modo == "Ruta":
                     rutas_list = [r for r, _ in sorted_routes]
-                    ruta_sel = st.selectbox("Selecciona una Ruta", rutas_list)
-                    segmentos = ruta_sel.split("→")
+                    ruta_sel = st.selectbox("Selecciona una Ruta", rutas_list,
+                                            format_func=tracker.format_route)
+                    segmentos = ruta_sel
                     seg_rows = [
                         {"Segmento": f"{segmentos[i]} → {segmentos[i+1]}"}
                         for i in range(len(segmentos)-1)
@@ -353,73 +376,65 @@ def run_dashboard():
                     st.markdown("Rutas frecuentes que incluyen este nodo:")
                     rutas_con_nodo = [
                         path for path, _ in sorted_routes
-                        if str(nodo_sel) in path.split("→")
+                        if nodo_sel in path
                     ]
                     if rutas_con_nodo:
                         for r in rutas_con_nodo:
-                            st.write(f"- {r}")
+                            st.write(f"- {tracker.format_route(r)}")
                     else:
                         st.write("— Ninguna de las rutas frecuentes incluye este nodo.")
 
-                # 6) Visualizar el árbol AVL que guarda las rutas
+                # 6) Visualizar el árbol AVL que guarda las rutas: solo un
+                #    subárbol limitado en profundidad y cantidad de nodos
                 st.markdown("#### 🌳 Estructura AVL de Rutas")
-
-                def build_avl_graph(node, g):
-                    if not node:
-                        return
-                    label = f"{node.key}\\nFreq: {node.value}"
-                    g.add_node(label)
-                    if node.left:
-                        left_label = f"{node.left.key}\\nFreq: {node.left.value}"
-                        g.add_edge(label, left_label)
-                        build_avl_graph(node.left, g)
-                    if node.right:
-                        right_label = f"{node.right.key}\\nFreq: {node.right.value}"
-                        g.add_edge(label, right_label)
-                        build_avl_graph(node.right, g)
+                avl = tracker.avl
+                col_d, col_n = st.columns(2)
+                max_depth = col_d.slider("Niveles a dibujar", 1, 8, 4)
+                max_nodes = col_n.slider("Máximo de nodos", 1, 255, 31)
+
+                # Raíz del subárbol expandido (si ya no existe, la del árbol)
+                root_key = st.session_state.get("avl_root")
+                if root_key is None or avl.find(root_key) is None:
+                    root_key = avl.root.key
+                layout = cached_avl_layout(avl, avl.uid, avl.version, root_key, max_depth, max_nodes)
+                nodes = layout["nodes"]
+
+                def node_label(key):
+                    return f"{tracker.format_route(tracker.route_path(key))}\nFreq: {nodes[key][2]}"
+
+                # Expansión perezosa: elegir un nodo con hijos ocultos lo
+                # convierte en la raíz del dibujo
+                expandibles = [k for k, (_, _, _, oculto) in nodes.items() if oculto]
+                col_e, col_r = st.columns([3, 1])
+                if expandibles:
+                    sel = col_e.selectbox("Expandir subárbol de", expandibles,
+                                          format_func=lambda k: tracker.format_route(tracker.route_path(k)))
+                    if col_e.button("Expandir"):
+                        st.session_state["avl_root"] = sel
+                        st.rerun()
+                if root_key != avl.root.key and col_r.button("Volver a la raíz"):
+                    st.session_state.pop("avl_root", None)
+                    st.rerun()
 
                 avl_graph = nx.DiGraph()
-                build_avl_graph(tracker.avl.root, avl_graph)
-
-                def compute_tree_positions(node, x=0, y=0, pos=None, depth_spacing=1.5, x_step=1.0):
-                    """
-                    Asigna posiciones (x,y) a cada nodo basado en recorrido in-order.
-                    - depth_spacing controla la separación vertical entre niveles.
-                    - x_step controla la separación horizontal mínima.
-                    """
-                    if pos is None:
-                        pos = {}
-                    # Recorrer subárbol izquierdo
-                    if node.left:
-                        compute_tree_positions(node.left, x, y - depth_spacing, pos, depth_spacing, x_step)
-                    # Posición del nodo actual: 
-                    # Usamos un contador almacenado en pos['_x_counter']
-                    xc = pos.get('_x_counter', 0)
-                    label = f"{node.key}\\nFreq: {node.value}"
-                    pos[label] = (xc * x_step, y)
-                    pos['_x_counter'] = xc + 1
-                    # Recorrer subárbol derecho
-                    if node.right:
-                        compute_tree_positions(node.right, x, y - depth_spacing, pos, depth_spacing, x_step)
-                    return pos
-
-                # Invocación del conjuro
-                # Inicializa contador
-                positions = compute_tree_positions(tracker.avl.root, y=0)
-                # Elimina la llave interna
-                positions.pop('_x_counter', None)
+                avl_graph.add_nodes_from(nodes)
+                avl_graph.add_edges_from(layout["edges"])
+                positions = {k: (x, y) for k, (x, y, _, _) in nodes.items()}
+                colores = ["#ffcc80" if nodes[k][3] else "#90caf9" for k in avl_graph.nodes]
 
                 # 3) Dibujar
-                fig, ax = plt.subplots(figsize=(12, 8))
+                fig, ax = plt.subplots(figsize=(max(8, min(len(nodes), 40) * 0.8), 2 + 1.5 * max_depth))
                 nx.draw(avl_graph,
                         pos=positions,
+                        labels={k: node_label(k) for k in nodes},
                         with_labels=True,
                         arrows=False,
-                        node_size=3000,
-                        node_color="#90caf9",
-                        font_size=10,
+                        node_size=1200,
+                        node_color=colores,
+                        font_size=8,
                         ax=ax)
                 st.pyplot(fig)
+                st.caption(f"{len(nodes)} de {len(avl.index)} rutas; en naranjo, nodos con hijos sin dibujar.")
 
 
     with p5:
@@ -432,15 +447,13 @@ def run_dashboard():
             tracker = sim.route_tracker
             graph = sim.graph
 
-            # Contar roles de nodos
-            role_counts = {"cliente": 0, "almacenamiento": 0, "recarga": 0}
-            for v in graph.vertices():
-                if v.is_client:
-                    role_counts["cliente"] += 1
-                elif v.is_warehouse:
-                    role_counts["almacenamiento"] += 1
-                elif v.is_recharge:
-                    role_counts["recarga"] += 1
+            # Contar roles de nodos (sobre la máscara de roles de la instantánea)
+            roles = graph.freeze().roles
+            role_counts = {
+                "cliente": int(np.count_nonzero(roles & CLIENT)),
+                "almacenamiento": int(np.count_nonzero(roles & WAREHOUSE)),
+                "recarga": int(np.count_nonzero(roles & RECHARGE)),
+            }
 
             # Gráfico de torta (proporción por rol)
             st.markdown("### Proporción de nodos por tipo")
@@ -449,40 +462,29 @@ def run_dashboard():
             ax_pie.axis('equal')
             st.pyplot(fig_pie)
 
-            # Gráfico de barras (nodos más visitados por tipo)
-            visit_stats = tracker.get_node_visit_stats()
-            client_visits = {}
-            warehouse_visits = {}
-            recharge_visits = {}
-
-            for node_id, count in visit_stats.items():
-                v = graph.get_vertex(node_id)
-                if v:
-                    if v.is_client:
-                        client_visits[node_id] = count
-                    elif v.is_warehouse:
-                        warehouse_visits[node_id] = count
-                    elif v.is_recharge:
-                        recharge_visits[node_id] = count
+            # Gráfico de barras (nodos más visitados por tipo), desde los
+            # arreglos de visitas por rol del tracker
+            top = st.slider("Nodos por tipo", 1, 50, 10)
+            top_por_rol = {
+                role: dict(tracker.top_visited(top, role))
+                for role in (CLIENT, WAREHOUSE, RECHARGE)
+            }
 
             st.markdown("### Nodos más visitados por tipo")
             fig_bar, ax_bar = plt.subplots()
             width = 0.25
-            labels = list(set(client_visits.keys()) | set(warehouse_visits.keys()) | set(recharge_visits.keys()))
-            labels.sort()
-            x = range(len(labels))
-            c_vals = [client_visits.get(i, 0) for i in labels]
-            w_vals = [warehouse_visits.get(i, 0) for i in labels]
-            r_vals = [recharge_visits.get(i, 0) for i in labels]
-
-            ax_bar.bar([i - width for i in x], c_vals, width, label='Clientes', color='green')
+            labels = sorted(set().union(*top_por_rol.values()))
+            x = np.arange(len(labels))
+            c_vals = [top_por_rol[CLIENT].get(i, 0) for i in labels]
+            w_vals = [top_por_rol[WAREHOUSE].get(i, 0) for i in labels]
+            r_vals = [top_por_rol[RECHARGE].get(i, 0) for i in labels]
+
+            ax_bar.bar(x - width, c_vals, width, label='Clientes', color='green')
             ax_bar.bar(x, w_vals, width, label='Almacenes', color='orange')
-            ax_bar.bar([i + width for i in x], r_vals, width, label='Estaciones', color='blue')
+            ax_bar.bar(x + width, r_vals, width, label='Estaciones', color='blue')
             ax_bar.set_xticks(x)
             ax_bar.set_xticklabels(labels)
             ax_bar.set_ylabel("Visitas")
             ax_bar.set_title("Visitas por Nodo")
             ax_bar.legend()
             st.pyplot(fig_bar)
-
-
@@ -0,0 +1,81 @@
+import numpy as np
+from model.frozen_graph import WAREHOUSE, RECHARGE
+
+# Colores por rol (los mismos que usaba el dashboard por marcador)
+ROLE_COLORS = {"almacenamiento": "orange", "recarga": "blue", "cliente": "green"}
+
+
+def _role_names(roles):
+    names = np.full(len(roles), "cliente", dtype=object)
+    names[roles & RECHARGE != 0] = "recarga"
+    names[roles & WAREHOUSE != 0] = "almacenamiento"
+    return names.tolist()
+
+
+def network_geojson(graph):
+    """
+    Construye la capa base de la red como dos FeatureCollection GeoJSON:
+    (nodos, aristas). Cada nodo es un Point con id, rol y color; cada arista
+    un LineString con su costo. Acepta un Graph o un FrozenGraph y trabaja
+    sobre la instantánea CSR, sin recorrer objetos Vertex/Edge.
+    """
+    fg = graph.freeze()
+    ids = fg.ids.tolist()
+    lat = fg.lat.tolist()
+    lon = fg.lon.tolist()
+    roles = _role_names(fg.roles)
+
+    nodes = {"type": "FeatureCollection", "features": [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon[i], lat[i]]},
+            "properties": {"id": ids[i], "role": roles[i], "color": ROLE_COLORS[roles[i]]},
+        }
+        for i in range(len(ids))
+    ]}
+
+    src, dst, costs = fg.undirected_edges()
+    cast = int if fg.integral else float
+    edges = {"type": "FeatureCollection", "features": [
+        {
+            "type": "Feature",
+            "geometry": {"type": "LineString",
+                         "coordinates": [[lon[u], lat[u]], [lon[v], lat[v]]]},
+            "properties": {"from": ids[u], "to": ids[v], "cost": cast(c)},
+        }
+        for u, v, c in zip(src.tolist(), dst.tolist(), costs.tolist())
+    ]}
+    return nodes, edges
+
+
+def _vertex_id(v):
+    return v.element()['id'] if hasattr(v, 'element') else v
+
+
+def segments_geojson(graph, segments):
+    """
+    Capa GeoJSON con un LineString por segmento (u, v, peso), donde u y v son
+    ids o Vertex (como los retorna RouteOptimizer.kruskal_mst). Sirve para
+    superponer el MST sin crear un objeto folium por arista.
+    """
+    fg = graph.freeze()
+    lat, lon = fg.lat, fg.lon
+    features = []
+    for u_id, v_id, w in segments:
+        u_id, v_id = _vertex_id(u_id), _vertex_id(v_id)
+        u, v = fg.index(u_id), fg.index(v_id)
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString",
+                         "coordinates": [[float(lon[u]), float(lat[u])], [float(lon[v]), float(lat[v])]]},
+            "properties": {"from": u_id, "to": v_id, "weight": w},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def path_coordinates(graph, path):
+    """Retorna [(lat, lon), ...] de una ruta dada como lista de ids."""
+    fg = graph.freeze()
+    idx = [fg.index(vid) for vid in path]
+    return list(zip(fg.lat[idx].tolist(), fg.lon[idx].tolist()))
+
@@ -1,5 +1,6 @@
 import networkx as nx
 from model.edge import Edge
+from model.frozen_graph import WAREHOUSE, RECHARGE
 
 class NetworkXAdapter:
     def __init__(self, custom_graph):
@@ -7,15 +8,17 @@ class NetworkXAdapter:
         self.nx_graph = self._convert_to_networkx()
 
     def _convert_to_networkx(self):
+        # Acepta un Graph o un FrozenGraph: ambos exponen freeze()
+        fg = self.custom_graph.freeze()
         G = nx.Graph()
-        for v in self.custom_graph.vertices():
-            v_id = v.element()['id']
-            role = "almacenamiento" if v.is_warehouse else "recarga" if v.is_recharge else "cliente"
+        ids = fg.ids.tolist()
+        for v_id, r in zip(ids, fg.roles.tolist()):
+            role = "almacenamiento" if r & WAREHOUSE else "recarga" if r & RECHARGE else "cliente"
             G.add_node(v_id, role=role)
-        for e in self.custom_graph.edges():
-            u_id = e.endpoints()[0].element()['id']
-            v_id = e.endpoints()[1].element()['id']
-            G.add_edge(u_id, v_id, weight=e.cost())
+        src, dst, costs = fg.undirected_edges()
+        cast = int if fg.integral else float
+        for u, v, c in zip(src.tolist(), dst.tolist(), costs.tolist()):
+            G.add_edge(ids[u], ids[v], weight=cast(c))
         return G
 
     def get_networkx_graph(self):